@@ -0,0 +1,492 @@
+"""Reproducible CPU benchmarks for data loading, training steps and evaluation.
+
+Everything runs on synthetic images written to a temporary directory, so the
+numbers do not depend on the mounted drive. Each measurement does warm-up
+iterations first and reports percentiles over the timed repetitions.
+
+    results = run_suite(dataset_factory, model_factory, BenchmarkConfig())
+    save_results(results, "bench/ynet.json")
+    print(compare_results(load_results("bench/old.json"), results))
+
+dataset_factory(images, masks, labels) builds a DriveDataset and
+model_factory() a fresh model, so the same suite serves build_unet and
+binary_Classification.
+"""
+
+import os
+import copy
+import json
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+import numpy as np
+import cv2
+import torch
+from torch.utils.data import DataLoader
+
+from inference_engine import InferenceEngine, InferenceStats
+
+
+class BenchmarkConfig:
+    def __init__(self, num_images=64, image_size=(600, 450), model_size=(256, 256),
+                 batch_sizes=(1, 2, 5, 8), loader_batch_size=5, num_workers=(0, 1, 2, 4),
+                 loader_batches=10, warmup=3, repeats=10, mean=None, std=None, seed=0):
+        self.num_images = num_images
+        self.image_size = image_size          ## (W, H) of the synthetic source images
+        self.model_size = model_size          ## (W, H) the dataset / engine resize to
+        self.batch_sizes = batch_sizes
+        self.loader_batch_size = loader_batch_size
+        self.num_workers = num_workers
+        self.loader_batches = loader_batches
+        self.warmup = warmup
+        self.repeats = repeats
+        self.mean = mean
+        self.std = std
+        self.seed = seed
+
+    def to_dict(self):
+        return {k: list(v) if isinstance(v, tuple) else v for k, v in vars(self).items()}
+
+
+def percentiles(times_ms):
+    t = np.asarray(times_ms, dtype=np.float64)
+    return {"mean": float(t.mean()), "p50": float(np.percentile(t, 50)),
+            "p90": float(np.percentile(t, 90)), "p99": float(np.percentile(t, 99)), "n": int(t.size)}
+
+
+def timeit(fn, warmup=3, repeats=10):
+    """ Wall time of fn() in ms, per repetition """
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return times
+
+
+def make_synthetic_dataset(root, count, image_size=(600, 450), seed=0):
+    """ Random JPEG images + PNG masks + labels, named like the ISIC files """
+    rng = np.random.default_rng(seed)
+    W, H = image_size
+    os.makedirs(os.path.join(root, "images"), exist_ok=True)
+    os.makedirs(os.path.join(root, "masks"), exist_ok=True)
+    images, masks = [], []
+    for i in range(count):
+        name = f"ISIC_{i:07d}"
+        image = rng.integers(0, 256, size=(H, W, 3), dtype=np.uint8)
+        mask = np.zeros((H, W), dtype=np.uint8)
+        cy, cx, r = rng.integers(H // 4, 3 * H // 4), rng.integers(W // 4, 3 * W // 4), rng.integers(H // 8, H // 3)
+        cv2.circle(mask, (int(cx), int(cy)), int(r), 255, -1)
+        images.append(os.path.join(root, "images", name + ".jpg"))
+        masks.append(os.path.join(root, "masks", name + "_segmentation.png"))
+        cv2.imwrite(images[-1], image)
+        cv2.imwrite(masks[-1], mask)
+    labels = rng.integers(0, 2, size=count).tolist()
+    return images, masks, labels
+
+
+def bench_getitem(dataset, warmup=3, repeats=10):
+    """ Samples/s of DriveDataset.__getitem__ on a single thread """
+    n = len(dataset)
+    state = {"i": 0}
+
+    def one():
+        dataset[state["i"] % n]
+        state["i"] += 1
+
+    times = timeit(one, warmup, max(repeats, n))
+    return {"latency_ms": percentiles(times), "samples_per_s": 1000.0 / np.mean(times)}
+
+
+def bench_loader(dataset, batch_size=5, num_workers=(0, 1, 2, 4), num_batches=10):
+    """ DataLoader throughput for each num_workers, first batch (worker start-up) excluded """
+    results = {}
+    for workers in num_workers:
+        loader = DataLoader(dataset, batch_size=batch_size, shuffle=True, num_workers=workers)
+        it = iter(loader)
+        startup = time.perf_counter()
+        next(it)
+        startup = (time.perf_counter() - startup) * 1000.0
+        n_samples, start = 0, time.perf_counter()
+        for i, batch in enumerate(it):
+            n_samples += len(batch[0])
+            if i + 1 >= num_batches:
+                break
+        elapsed = time.perf_counter() - start
+        results[str(workers)] = {"startup_ms": startup,
+                                 "samples_per_s": n_samples / elapsed if elapsed > 0 else 0.0}
+        del it, loader
+    return results
+
+
+def _loss(outputs):
+    """ Scalar touching every output, to drive backward without targets """
+    outputs = outputs if isinstance(outputs, (tuple, list)) else (outputs,)
+    return sum(o.float().mean() for o in outputs)
+
+
+def bench_model(model_factory, batch_sizes=(1, 2, 5, 8), model_size=(256, 256), warmup=3, repeats=10, seed=0):
+    """ Forward (eval, inference_mode) and forward+backward (train) latency per batch size """
+    torch.manual_seed(seed)
+    model = model_factory()
+    W, H = model_size
+    results = {}
+    for bs in batch_sizes:
+        x = torch.randn(bs, 3, H, W)
+
+        model.eval()
+
+        def forward():
+            with torch.inference_mode():
+                model(x)
+
+        fwd = timeit(forward, warmup, repeats)
+
+        model.train()
+
+        def step():
+            model.zero_grad(set_to_none=True)
+            _loss(model(x)).backward()
+
+        bwd = timeit(step, warmup, repeats)
+        results[str(bs)] = {"forward_ms": percentiles(fwd), "train_step_ms": percentiles(bwd),
+                            "forward_samples_per_s": bs * 1000.0 / np.median(fwd)}
+    return results
+
+
+def bench_evaluation(model, paths, config, batch_size=16, num_workers=4):
+    """ End-to-end evaluation throughput (decode + preprocess + forward) with InferenceEngine """
+    model.eval()
+    engine = InferenceEngine(model, torch.device("cpu"), size=config.model_size, batch_size=batch_size,
+                             num_workers=num_workers, mean=config.mean, std=config.std)
+    for _ in engine.predict(paths[:batch_size]):
+        pass
+    runs = []
+    for _ in range(max(1, config.repeats // 5)):
+        engine.stats = InferenceStats()
+        for _ in engine.predict(paths):
+            pass
+        runs.append(engine.stats.fps)
+    return {"samples_per_s": percentiles(runs), "batch_size": batch_size}
+
+
+class SavedTensorMeter:
+    """ Bytes of tensors autograd keeps alive for backward, deduplicated by storage """
+
+    def __init__(self):
+        self.bytes = 0
+        self._seen = set()
+        self._hooks = torch.autograd.graph.saved_tensors_hooks(self._pack, lambda t: t)
+
+    def _pack(self, t):
+        key = (t.untyped_storage().data_ptr(), t.dtype, t.numel())
+        if key not in self._seen:
+            self._seen.add(key)
+            self.bytes += t.numel() * t.element_size()
+        return t
+
+    def __enter__(self):
+        self._hooks.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._hooks.__exit__(*exc)
+
+
+def synthetic_batches(num_batches, batch_size, model_size=(256, 256), seed=0):
+    """ Fixed (image, mask, label) float batches with a learnable mask/label signal """
+    g = torch.Generator().manual_seed(seed)
+    W, H = model_size
+    batches = []
+    for _ in range(num_batches):
+        x = torch.randn(batch_size, 3, H, W, generator=g)
+        mask = (x[:, :1] > 0).float()
+        label = (x.mean(dim=(1, 2, 3)) > 0).float()
+        batches.append((x, mask, label))
+    return batches
+
+
+def bench_precision(model_factory, loss_fn, batch_size=5, model_size=(256, 256), steps=30,
+                    warmup=3, repeats=10, lr=1e-3, seed=0, tol=0.05):
+    """ fp32 NCHW vs bfloat16 autocast + channels_last on CPU
+
+    loss_fn(outputs, batch) -> scalar loss, computed in fp32. Reports train step time,
+    activation memory kept for backward and the loss curve of ``steps`` SGD steps over
+    a small fixed subset, started from the same weights. ``converges`` is True when the
+    bf16 final loss (mean of the last 5 steps) is within ``tol`` relative of fp32's.
+    """
+    torch.manual_seed(seed)
+    init_state = copy.deepcopy(model_factory().state_dict())
+    batches = synthetic_batches(4, batch_size, model_size, seed)
+    modes = {"fp32": (None, False), "bf16_channels_last": (torch.bfloat16, True)}
+    results = {}
+
+    for mode, (amp_dtype, channels_last) in modes.items():
+        model = model_factory()
+        model.load_state_dict(init_state)
+        model.train()
+        memory_format = torch.channels_last if channels_last else torch.contiguous_format
+        model = model.to(memory_format=memory_format)
+        optimizer = torch.optim.SGD(model.parameters(), lr=lr, momentum=0.9)
+
+        def step(batch, meter=None):
+            x = batch[0].contiguous(memory_format=memory_format)
+            optimizer.zero_grad(set_to_none=True)
+            with torch.autocast(device_type="cpu", dtype=amp_dtype or torch.bfloat16, enabled=amp_dtype is not None):
+                if meter is None:
+                    outputs = model(x)
+                else:
+                    with meter:
+                        outputs = model(x)
+            outputs = tuple(o.float() for o in outputs) if isinstance(outputs, (tuple, list)) else outputs.float()
+            loss = loss_fn(outputs, batch)
+            loss.backward()
+            optimizer.step()
+            return loss.item()
+
+        meter = SavedTensorMeter()
+        step(batches[0], meter)
+        model.load_state_dict(init_state)
+        optimizer = torch.optim.SGD(model.parameters(), lr=lr, momentum=0.9)
+        losses = [step(batches[i % len(batches)]) for i in range(steps)]
+
+        times = timeit(lambda: step(batches[0]), warmup, repeats)
+        results[mode] = {"train_step_ms": percentiles(times), "activation_bytes": meter.bytes, "losses": losses}
+
+    fp32, bf16 = results["fp32"], results["bf16_channels_last"]
+    final_fp32, final_bf16 = np.mean(fp32["losses"][-5:]), np.mean(bf16["losses"][-5:])
+    results["speedup"] = fp32["train_step_ms"]["p50"] / bf16["train_step_ms"]["p50"]
+    results["memory_ratio"] = bf16["activation_bytes"] / max(fp32["activation_bytes"], 1)
+    results["final_loss_rel_diff"] = float(abs(final_bf16 - final_fp32) / max(abs(final_fp32), 1e-12))
+    results["tol"] = tol
+    results["converges"] = results["final_loss_rel_diff"] <= tol
+    return results
+
+
+def bench_augmentation(batch_size=16, model_size=(256, 256), warmup=3, repeats=10, seed=0):
+    """ Samples/s of the vectorized BatchAugment vs per-sample OpenCV warpAffine augmentation """
+    from ynet.augment import BatchAugment, augment_sample_opencv
+    rng = np.random.default_rng(seed)
+    W, H = model_size
+    images = rng.integers(0, 256, (batch_size, H, W, 3), dtype=np.uint8)
+    masks = (rng.random((batch_size, H, W)) > 0.5).astype(np.uint8) * 255
+    image_batch = torch.from_numpy(images).permute(0, 3, 1, 2).float().div(255)
+    mask_batch = torch.from_numpy(masks[:, None]).float().div(255) * 2 - 1
+
+    augment = BatchAugment(generator=torch.Generator().manual_seed(seed))
+    py_rng = np.random.default_rng(seed)
+
+    def opencv():
+        for image, mask in zip(images, masks):
+            augment_sample_opencv(image, mask, py_rng)
+
+    batch_times = timeit(lambda: augment(image_batch, mask_batch), warmup, repeats)
+    opencv_times = timeit(opencv, warmup, repeats)
+    batched, per_sample = percentiles(batch_times), percentiles(opencv_times)
+    return {
+        "batch_size": batch_size,
+        "batched_ms": batched,
+        "opencv_ms": per_sample,
+        "batched_samples_per_s": batch_size / (batched["p50"] / 1000),
+        "opencv_samples_per_s": batch_size / (per_sample["p50"] / 1000),
+    }
+
+
+def reset_peak_rss():
+    """ Reset the process high-water mark (Linux >= 4.0); returns False where unsupported """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _proc_status_bytes(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+    raise OSError(f"{field} not in /proc/self/status")
+
+
+def peak_rss():
+    """ Peak resident set size of this process in bytes, since start or the last reset_peak_rss() """
+    try:
+        return _proc_status_bytes("VmHWM")
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def current_rss():
+    try:
+        return _proc_status_bytes("VmRSS")
+    except OSError:
+        return peak_rss()
+
+
+def _train_step(model, optimizer, loss_fn, batch, meter=None):
+    optimizer.zero_grad(set_to_none=True)
+    if meter is None:
+        outputs = model(batch[0])
+    else:
+        with meter:
+            outputs = model(batch[0])
+    loss = loss_fn(outputs, batch)
+    loss.backward()
+    optimizer.step()
+    return loss.item()
+
+
+def _checkpointed_model(model_factory, checkpointing):
+    model = model_factory()
+    if hasattr(model, "set_checkpointing"):
+        model.set_checkpointing(checkpointing)
+    return model.train()
+
+
+def peak_step_memory(model, optimizer, loss_fn, batch, device, base_rss=0):
+    """ Peak bytes in use during one training step, after a warm-up step created the optimizer state
+
+    On CUDA torch.cuda.max_memory_allocated (everything torch allocated on the device); on CPU the
+    process high-water mark minus base_rss. Unlike SavedTensorMeter this sees what checkpointing keeps
+    outside autograd's hooks: the inputs of every checkpointed block and the recompute working set.
+    """
+    _train_step(model, optimizer, loss_fn, batch)
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+        torch.cuda.reset_peak_memory_stats(device)
+        _train_step(model, optimizer, loss_fn, batch)
+        torch.cuda.synchronize(device)
+        return torch.cuda.max_memory_allocated(device)
+    if not reset_peak_rss():
+        raise RuntimeError("Peak memory needs /proc/self/clear_refs (Linux) on CPU")
+    _train_step(model, optimizer, loss_fn, batch)
+    return peak_rss() - base_rss
+
+
+def bench_checkpointing(model_factory, loss_fn, batch_size=5, model_size=(256, 256), warmup=3, repeats=10, seed=0):
+    """ Train step time, activation bytes seen by autograd's hooks and measured peak training memory
+    with and without activation checkpointing; model_factory() must return a model with
+    set_checkpointing(enabled). memory_ratio compares the measured peaks. """
+    batch = synthetic_batches(1, batch_size, model_size, seed)[0]
+    device = torch.device("cpu")
+    base_rss = current_rss()
+    results = {}
+    """ Checkpointed first: memory the allocator keeps after the larger baseline step would inflate its peak """
+    for mode, checkpointing in {"checkpointed": True, "baseline": False}.items():
+        torch.manual_seed(seed)
+        model = _checkpointed_model(model_factory, checkpointing)
+        optimizer = torch.optim.SGD(model.parameters(), lr=1e-3, momentum=0.9)
+        meter = SavedTensorMeter()
+        _train_step(model, optimizer, loss_fn, batch, meter)
+        peak = peak_step_memory(model, optimizer, loss_fn, batch, device, base_rss)
+        times = timeit(lambda: _train_step(model, optimizer, loss_fn, batch), warmup, repeats)
+        results[mode] = {"train_step_ms": percentiles(times), "activation_bytes": meter.bytes,
+                         "peak_bytes": peak, "peak_rss_bytes": peak_rss()}
+        del model, optimizer
+    base, ckpt = results["baseline"], results["checkpointed"]
+    results["slowdown"] = ckpt["train_step_ms"]["p50"] / base["train_step_ms"]["p50"]
+    results["memory_ratio"] = ckpt["peak_bytes"] / max(base["peak_bytes"], 1)
+    return results
+
+
+def max_batch_size(model_factory, loss_fn, budget_bytes, model_size=(256, 256), checkpointing=False, limit=1024,
+                   device=None):
+    """ Largest batch whose training memory fits budget_bytes
+
+    The peak memory of a full training step (weights, gradients, SGD momentum, everything the forward
+    keeps for backward including checkpointed block inputs, and the backward working set) is measured
+    at batch 1 and 2 on device (CUDA if available) and extrapolated linearly.
+    """
+    device = device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    base_rss = current_rss()
+    model = _checkpointed_model(model_factory, checkpointing).to(device)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.0, momentum=0.9)
+    peaks = []
+    for batch_size in (1, 2):
+        batch = [t.to(device) for t in synthetic_batches(1, batch_size, model_size)[0]]
+        peaks.append(peak_step_memory(model, optimizer, loss_fn, batch, device, base_rss))
+    per_sample = max(peaks[1] - peaks[0], 1)
+    constant = peaks[0] - per_sample
+    fits = int((budget_bytes - constant) // per_sample)
+    return {"batch_size": max(0, min(fits, limit)), "fixed_bytes": constant,
+            "bytes_per_sample": per_sample, "budget_bytes": budget_bytes}
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                         cwd=os.path.dirname(os.path.abspath(__file__)),
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "torch": torch.__version__, "python": platform.python_version(),
+            "machine": platform.machine(), "processor": platform.processor(),
+            "cpu_count": os.cpu_count(), "torch_threads": torch.get_num_threads(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def run_suite(dataset_factory, model_factory, config=None, root=None):
+    """ Run every benchmark on CPU; returns a JSON-able dict """
+    config = config or BenchmarkConfig()
+    own_root = root is None
+    root = root or tempfile.mkdtemp(prefix="ynet_bench_")
+    try:
+        images, masks, labels = make_synthetic_dataset(root, config.num_images, config.image_size, config.seed)
+        dataset = dataset_factory(images, masks, labels)
+        results = {"environment": environment(), "config": config.to_dict()}
+        results["getitem"] = bench_getitem(dataset, config.warmup, config.repeats)
+        results["loader"] = bench_loader(dataset, config.loader_batch_size, config.num_workers, config.loader_batches)
+        results["model"] = bench_model(model_factory, config.batch_sizes, config.model_size,
+                                       config.warmup, config.repeats, config.seed)
+        results["evaluation"] = bench_evaluation(model_factory(), images, config)
+        return results
+    finally:
+        if own_root:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def save_results(results, path):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _flatten(d, prefix=""):
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            yield from _flatten(v, key)
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            yield key, v
+
+
+def compare_results(old, new, threshold=0.10):
+    """ Table of metrics that moved more than threshold (relative) between two result files """
+    skip = ("environment", "config")
+    old_flat = {k: v for k, v in _flatten(old) if not k.startswith(skip)}
+    new_flat = {k: v for k, v in _flatten(new) if not k.startswith(skip)}
+    lines = [f"{'metric':<50} {'old':>10} {'new':>10} {'change':>8}"]
+    for key in sorted(old_flat.keys() & new_flat.keys()):
+        if key.endswith(".n"):
+            continue
+        a, b = old_flat[key], new_flat[key]
+        if a == 0:
+            continue
+        change = (b - a) / abs(a)
+        if abs(change) >= threshold:
+            lines.append(f"{key:<50} {a:>10.3f} {b:>10.3f} {100 * change:>+7.1f}%")
+    return "\n".join(lines)
@@ -7,239 +7,32 @@ Original file is located at
     https://colab.research.google.com/drive/1k-j4C9JOsnkn0AvTPLBJPtlM1WEeB6A5
 """
 
-from google.colab import drive
-drive.mount('/content/drive')
-
-import os
-import numpy as np
-import cv2
-import torch
-from torch.utils.data import Dataset
-import torchvision.transforms.functional as TF
-
-class DriveDataset(Dataset):
-    def __init__(self, images_path, labels):
-
-        self.images_path = images_path
-        self.labels = labels
-        self.n_samples = len(images_path)
-
-    def __getitem__(self, index):
-        """ Reading image """
-        image = cv2.imread(self.images_path[index], cv2.IMREAD_COLOR)
-        image = image/255.0 
-        image = cv2.resize(np.float32(image),size,interpolation = cv2.INTER_NEAREST ) ## (256, 256, 3)
-        image = np.transpose(image, (2, 0, 1))  ## (3, 256, 256)
-        image = image.astype(np.float32)
-        image = torch.from_numpy(image)
-        # image = TF.normalize(image,mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-
-        """ Reading classification Label """
-        label = self.labels[index]
-        
-        return image, label
-
-    def __len__(self):
-        return self.n_samples
+if __name__ == "__main__":
+  from google.colab import drive
+  drive.mount('/content/drive')
 
+"""Models, datasets and the train / evaluate loops live in the importable ynet package"""
 import os
 import time
-import random
 import numpy as np
 import cv2
 import torch
 
-""" Seeding the randomness. """
-def seeding(seed):
-    random.seed(seed)
-    os.environ["PYTHONHASHSEED"] = str(seed)
-    np.random.seed(seed)
-    torch.manual_seed(seed)
-    torch.cuda.manual_seed(seed)
-    torch.backends.cudnn.deterministic = True
-
-""" Create a directory. """
-def create_dir(path):
-    if not os.path.exists(path):
-        os.makedirs(path)
-
-""" Calculate the time taken """
-def epoch_time(start_time, end_time):
-    elapsed_time = end_time - start_time
-    elapsed_mins = int(elapsed_time / 60)
-    elapsed_secs = int(elapsed_time - (elapsed_mins * 60))
-    return elapsed_mins, elapsed_secs
-
-import torch
-import torch.nn as nn
-import torch.nn.functional as F
-
-class CustomBCELoss:
-
-    def __init__(self):
-      self.bce = nn.BCELoss()
+from ynet.datasets import ClassificationDataset as DriveDataset, load_split
+from ynet.utils import seeding, create_dir, epoch_time
+from ynet.models import conv_block, encoder_block, binary_Classification
+from ynet.training import train_classifier as train, evaluate_classifier as evaluate
+from ynet.loader import LoaderConfig, BatchPreparer, make_loader
 
-    def __call__(self, yhat, ys):
-      yhat = torch.sigmoid(yhat)
-      yhat = yhat.view(-1)
-      ys = ys.view(-1)
-      # print("After Sigmoid: ", yhat, ys)
-      yhat, ys = yhat.float(), ys.float()
-    
-      return self.bce(yhat, ys)
-
-# from model import build_unet 
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
-
-class conv_block(nn.Module):
-    def __init__(self, in_c, out_c):
-        super().__init__()
-
-        self.conv1 = nn.Conv2d(in_c, out_c, kernel_size = 3, padding = 1)
-        self.bn1 = nn.BatchNorm2d(out_c)
-
-        self.conv2 = nn.Conv2d(out_c, out_c, kernel_size = 3, padding = 1)
-        self.bn2 = nn.BatchNorm2d(out_c)
-
-        self.relu = nn.ReLU()
-
-    def forward(self, inputs):
-        x = self.conv1(inputs)
-        x = self.bn1(x)
-        x = self.relu(x)
-
-        x = self.conv2(x)
-        x = self.bn2(x)
-        x = self.relu(x)
-
-        return x
-
-class encoder_block(nn.Module):
-    def __init__(self, in_c, out_c):
-        super().__init__()
-
-        self.conv = conv_block(in_c, out_c)
-        self.pool = nn.MaxPool2d((2, 2))
-
-    def forward(self, inputs):
-        x = self.conv(inputs)
-        p = self.pool(x)
-
-        return p
-
-class decoder_block(nn.Module):
-    def __init__(self, in_c, out_c):
-        super().__init__()
-
-        self.up = nn.ConvTranspose2d(in_c, out_c, kernel_size=2, stride=2, padding=0)
-        self.conv = conv_block(out_c+out_c, out_c)
-
-    def forward(self, inputs, skip):
-        x = self.up(inputs)
-        x = torch.cat([x, skip], axis=1)
-        x = self.conv(x)
-        return x
-
-class binary_Classification(nn.Module):
-    def __init__(self):
-        super().__init__()
-
-        """ Classification classifier """
-        self.e1 = encoder_block(3,64)
-        # self.e2 = encoder_block(64, 128)
-        # self.b = conv_block(64, 128)
-        # self.e5 = encoder_block(128,256)
-        self.global_avg = nn.AdaptiveAvgPool2d(1)
-        self.fc1 = nn.Linear(64, 64)
-        self.fc2 = nn.Linear(64, 32)   
-        self.fc3 = nn.Linear(32, 1)       ### ---> 2nd dimension is the number of classification labels
-        self.sigmoid = nn.Sigmoid()
-
-    def forward(self, inputs):
-
-        """ Diagnostic branch """
-        p1 = self.e1(inputs)
-        # p2 = self.e2(p1)
-        # b = self.b(p2)
-        # p5 = self.e5(p2)
-        avg = self.global_avg(p1)
-        avg = avg.view(avg.size(0), -1)
-        fc1 = self.fc1(avg)
-        fc2 = self.fc2(fc1)
-        fc3 = self.fc3(fc2)
-        label = self.sigmoid(fc3)
-
-        return label
-
-import pandas as pd
-from itertools import repeat
-
-df1 = pd.read_csv('/content/drive/MyDrive/YNET/SkinCancerData/TrainLabels.csv')
-df2 = pd.read_csv('/content/drive/MyDrive/YNET/SkinCancerData/ValLabels.csv')
-df3 = pd.read_csv('/content/drive/MyDrive/YNET/SkinCancerData/TestLabels.csv')
-trainLabels, validLabels, testLabels = [], [], []
-trainLabels = df1['NV'].astype(int).tolist()
-validLabels = df2['NV'].astype(int).tolist()
-testLabels = df3['NV'].astype(int).tolist()
-
-print(len(trainLabels),len(validLabels),len(testLabels))
-
-import os
-import time
-from glob import glob
-
-import torch
+import sys
 from torch.utils.data import DataLoader
-from collections import OrderedDict
-import torchvision.models as models
 import torch.nn as nn
-import gc
 import torch.optim as optim
-
-def train(model, loader, optimizer, loss_fn, device):
-    epoch_loss = 0.0
-
-    model.train()
-    for x, y in loader:
-        torch.cuda.empty_cache()
-        x = x.to(device, dtype=torch.float32)
-        y = y.to(device, dtype=torch.float32)
-        
-        optimizer.zero_grad()
-        y_pred = model(x)
-        y_pred = y_pred.view(-1)
-        # y_pred, y = y_pred.int(), y.int()
-        # print(y_pred, y)
-        loss = loss_fn(y_pred, y)
-        loss.backward()
-        optimizer.step()
-        epoch_loss += loss.item()
-
-    epoch_loss = epoch_loss/len(loader)
-    return epoch_loss
-
-
-def evaluate(model, loader, loss_fn, device):
-    epoch_loss = 0.0
-
-    model.eval()
-    with torch.no_grad():
-        for x, y in loader:
-            x = x.to(device, dtype=torch.float32)
-            y = y.to(device, dtype=torch.float32)
-
-            y_pred = model(x)
-            y_pred = y_pred.view(-1)
-  
-            loss = loss_fn(y_pred, y)
-            epoch_loss += loss.item()
-
-        epoch_loss = epoch_loss/len(loader)
-    return epoch_loss
-
+from checkpoints import CheckpointManager
 
 if __name__ == "__main__":
     """ Seeding """
@@ -249,9 +42,8 @@ if __name__ == "__main__":
     create_dir("/content/drive/MyDrive/YNET/SavedModel")
 
     """ Load dataset """
-    train_x = sorted(glob("/content/drive/MyDrive/YNET/SkinCancerData/TrainImages925/*"))
-    
-    valid_x = sorted(glob("/content/drive/MyDrive/YNET/SkinCancerData/ValImages/*"))
+    train_x, _, trainLabels = load_split("TrainImages925", "TrainLabels.csv")
+    valid_x, _, validLabels = load_split("ValImages", "ValLabels.csv")
 
     data_str = f"Dataset Size:\nTrain: {len(train_x)} - Valid: {len(valid_x)}\n"
     print(data_str)
@@ -264,45 +56,61 @@ if __name__ == "__main__":
     num_epochs = 150
     lr = 1e-5
     checkpoint_path = "/content/drive/MyDrive/YNET/SavedModel/BCMyModelCheckpoint925.pth"
+    run_dir = "/content/drive/MyDrive/YNET/SavedModel/runs/bc925"   ## full training state, top-3 by valid loss
+    resume = "--resume" in sys.argv[1:]                              ## continue from run_dir/last.pt
+    cache_dir = "/content/cache/classification"   ## decoded dataset cache on local disk, None to decode every epoch
+    num_workers = "auto"                          ## loader workers, "auto" keeps the fastest of a short throughput probe
 
     """ Dataset and loader """
-    train_dataset = DriveDataset(train_x, trainLabels)
-    valid_dataset = DriveDataset(valid_x, validLabels)
+    train_dataset = DriveDataset(train_x, trainLabels, cache_dir=cache_dir, uint8=True)
+    valid_dataset = DriveDataset(valid_x, validLabels, cache_dir=cache_dir, uint8=True)
 
-    train_loader = DataLoader(dataset=train_dataset, batch_size=batch_size, shuffle=True, num_workers=1)
+    """ uint8 batches from persistent workers into pinned memory; scaled to [0, 1] on the device by prepare """
+    loader_config = LoaderConfig(batch_size=batch_size, num_workers=num_workers)
+    train_loader = make_loader(train_dataset, loader_config, shuffle=True)
+    print(f"Loader workers: {loader_config.num_workers}, pinned memory: {loader_config.pin_memory}")
 
-    valid_loader = DataLoader(dataset=valid_dataset, batch_size=batch_size, shuffle=True, num_workers=1)
+    valid_loader = make_loader(valid_dataset, loader_config, shuffle=True)
     
     trainLoss = []
     validLoss = []
-    device = torch.device('cuda')   ## GTX 1060 6GB
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    """ On CPU: bfloat16 autocast + channels_last conv stacks; None / False for plain fp32 NCHW """
+    amp_dtype = torch.bfloat16 if device.type == 'cpu' else None
+    channels_last = device.type == 'cpu'
     model = binary_Classification()
     model = model.to(device)
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
 
     # optimizer = torch.optim.Adam(model.parameters(), lr=lr)
     optimizer = optim.SGD(model.parameters(), lr=lr, momentum=0.8)
     scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(optimizer, 'min', patience=5, verbose=True)
-    loss_fn = nn.BCELoss()
+    loss_fn = nn.BCEWithLogitsLoss()
+    prepare = BatchPreparer(device)
 
     """ Training the model """
-    best_valid_loss = float("inf")
+    checkpoints = CheckpointManager(run_dir, keep=3, best_path=checkpoint_path)
+    start_epoch = checkpoints.resume(model, optimizer, scheduler) if resume else 0
+    trainLoss.extend(checkpoints.resumed_extra.get("trainLoss", []))
+    validLoss.extend(checkpoints.resumed_extra.get("validLoss", []))
+    best_valid_loss = checkpoints.best_loss
 
-    for epoch in range(num_epochs):
+    for epoch in range(start_epoch, num_epochs):
         start_time = time.time()
 
-        train_loss = train(model, train_loader, optimizer, loss_fn, device)
-        valid_loss = evaluate(model, valid_loader, loss_fn, device)
+        train_loss = train(model, train_loader, optimizer, loss_fn, device, amp_dtype, channels_last, prepare)
+        valid_loss = evaluate(model, valid_loader, loss_fn, device, amp_dtype, channels_last, prepare)
 
         trainLoss.append(train_loss)
         validLoss.append(valid_loss)
 
-        """ Saving the model """
-        if valid_loss < best_valid_loss:
+        """ Saving the model: full state every epoch, written in the background """
+        if checkpoints.save(epoch + 1, valid_loss, model, optimizer, scheduler, trainLoss=trainLoss, validLoss=validLoss):
             data_str = f"Valid loss improved from {best_valid_loss:2.4f} to {valid_loss:2.4f}. Saving checkpoint: {checkpoint_path}"
             print(data_str)
 
             best_valid_loss = valid_loss
-            torch.save(model.state_dict(), checkpoint_path)
 
         end_time = time.time()
         epoch_mins, epoch_secs = epoch_time(start_time, end_time)
@@ -312,17 +120,20 @@ if __name__ == "__main__":
         data_str += f'\t Val. Loss: {valid_loss:.3f}\n'
         print(data_str)
 
-import matplotlib.pyplot as plt
-import numpy as np
+    checkpoints.close()
 
-x = np.arange(150)
-plt.plot(x, trainLoss, color='r', label='Train Loss')
-plt.plot(x, validLoss, color='b', label='Valid Loss')
-plt.title('Training & Validation Loss over 75 epochs')
-plt.ylabel('values')
-plt.xlabel('epochs')
-plt.legend()
-plt.show()
+if __name__ == "__main__":
+  import matplotlib.pyplot as plt
+  import numpy as np
+
+  x = np.arange(150)
+  plt.plot(x, trainLoss, color='r', label='Train Loss')
+  plt.plot(x, validLoss, color='b', label='Valid Loss')
+  plt.title('Training & Validation Loss over 75 epochs')
+  plt.ylabel('values')
+  plt.xlabel('epochs')
+  plt.legend()
+  plt.show()
 
 import os, time
 from operator import add
@@ -330,12 +141,13 @@ import numpy as np
 from glob import glob
 import cv2
 from tqdm import tqdm
-import imageio
 import torch
-import matplotlib as plt
 from sklearn.metrics import accuracy_score, f1_score, jaccard_score, precision_score, recall_score, confusion_matrix, ConfusionMatrixDisplay
 from sklearn.metrics import classification_report
-
+from inference_engine import InferenceEngine
+from export_model import export_checkpoint, format_report
+from threshold_sweep import ProbabilityHistogram, format_sweep
+from stage_timer import StageTimer
 
 
 def calculate_metrics(y_true, y_pred):
@@ -358,8 +170,8 @@ if __name__ == "__main__":
   create_dir("/content/drive/MyDrive/YNET/SavedModel")
 
   """ Load dataset """
-  test_x = sorted(glob("/content/drive/MyDrive/YNET/SkinCancerData/TestImages/*"))
-  
+  test_x, _, testLabels = load_split("TestImages", "TestLabels.csv")
+
   """ Hyperparameters """
   H = 256
   W = 256
@@ -373,35 +185,27 @@ if __name__ == "__main__":
   model1.load_state_dict(torch.load(checkpoint_path, map_location=device))
   model1.eval()
 
+  """ Frozen TorchScript with BatchNorm folded into the convs, exported next to the checkpoint once per checkpoint version """
+  model1, report = export_checkpoint(model1, torch.randn(2, 3, H, W, device=device), checkpoint_path)
+  if report is not None:
+    print(format_report(report))
+
   metrics_score = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
-  time_taken = []
   predicted_labels = []
+  label_probs = []
 
-  for i, (x, y) in tqdm(enumerate(zip(test_x, testLabels)), total=len(test_x)):
-    """ Extract the name """
-    name = x.split("/")[-1].split(".")[0]
-
-    """ Reading image """
-    image = cv2.imread(x, cv2.IMREAD_COLOR) ## (256, 256, 3)
-    image = cv2.resize(image, size)
-    x = np.transpose(image, (2, 0, 1))      ## (3, 256, 256)
-    x = x/255.0
-    x = np.expand_dims(x, axis=0)           ## (1, 3, 256, 256)
-    x = x.astype(np.float32)
-    x = torch.from_numpy(x)
-    x = x.to(device)
-
+  """ Images are decoded in the background and run through the model in batches """
+  timer = StageTimer()                  ## per-stage latency breakdown, StageTimer(enabled=False) to skip
+  engine = InferenceEngine(model1, device, size=size, batch_size=32, num_workers=4, timer=timer)
 
-    with torch.no_grad():
-      """ Prediction and Calculating FPS """
-      start_time = time.time()
-      pred_label = model1(x)
-      # pred_label = torch.sigmoid(pred_label)
-      pred_label = 1 if pred_label > 0.5 else 0
-      predicted_labels.append(pred_label)
+  for pred in tqdm(engine.predict(test_x), total=len(test_x)):
+    pred_label = 1 if pred.label > 0.5 else 0
+    predicted_labels.append(pred_label)
+    label_probs.append(pred.label)
 
-      total_time = time.time() - start_time
-      time_taken.append(total_time)
+  """ ROC / PR and the F1-optimal threshold from one histogram of the probabilities """
+  label_sweep = ProbabilityHistogram(bins=1000)
+  label_sweep.update(torch.tensor(label_probs), torch.tensor(list(testLabels)))
 
   truthlabels = []
   for i in range(len(testLabels)):
@@ -427,5 +231,62 @@ if __name__ == "__main__":
   disp.plot()
   # plt.show()
 
-  fps = 1/np.mean(time_taken)
-  print("FPS: ", fps)
\ No newline at end of file
+  print(format_sweep(label_sweep.curves(), "Classifier"))
+  print("FPS: ", engine.stats.fps)
+  print("FPS (model only): ", engine.stats.forward_fps)
+  print(timer.table())
+  timer.export_chrome_trace("/content/drive/MyDrive/YNET/SavedModel/results/bc_eval_trace.json")
+
+"""Post-training INT8 quantization for CPU deployment"""
+from torch.utils.data import DataLoader
+from quantize import calibration_loader, quantize_model, save_quantized, compare_quantized, format_quantization_report
+
+if __name__ == "__main__":
+  """ Hyperparameters """
+  H = 256
+  W = 256
+  size = (W, H)
+  calibration_samples = 100
+  checkpoint_path = "/content/drive/MyDrive/YNET/SavedModel/BCMyModelCheckpoint925.pth"
+  quantized_path = checkpoint_path.replace(".pth", "_int8.pt")
+
+  """ Calibrate on the validation split, compare on the test split """
+  valid_x, _, validLabels = load_split("ValImages", "ValLabels.csv")
+  test_x, _, testLabels = load_split("TestImages", "TestLabels.csv")
+  calib_loader = calibration_loader(DriveDataset(valid_x, validLabels), num_samples=calibration_samples)
+  test_loader = DataLoader(DriveDataset(test_x, testLabels), batch_size=8, shuffle=False)
+
+  model = binary_Classification()
+  model.load_state_dict(torch.load(checkpoint_path, map_location="cpu"))
+  model.eval()
+
+  quantized = quantize_model(model, calib_loader)
+  save_quantized(quantized, next(iter(calib_loader))[0], quantized_path)
+  print(f"Saved quantized model: {quantized_path}")
+  print(format_quantization_report(compare_quantized(model, quantized, test_loader)))
+
+
+"""Benchmark data loading, forward/backward and evaluation throughput on synthetic data (CPU)"""
+import json
+from benchmark import BenchmarkConfig, run_suite, bench_precision, save_results, load_results, compare_results
+
+if __name__ == "__main__":
+  H = 256
+  W = 256
+  size = (W, H)
+  bench_path = "/content/drive/MyDrive/YNET/SavedModel/benchmarks/classification_latest.json"
+  baseline_path = "/content/drive/MyDrive/YNET/SavedModel/benchmarks/classification_baseline.json"
+
+  config = BenchmarkConfig(model_size=size)
+  results = run_suite(lambda images, masks, labels: DriveDataset(images, labels), binary_Classification, config)
+
+  """ fp32 vs bfloat16 autocast + channels_last training on CPU, on a small fixed subset """
+  precision_loss = lambda out, batch: nn.BCEWithLogitsLoss()(out.reshape(-1), batch[2])
+  results["precision"] = bench_precision(binary_Classification, precision_loss, batch_size=5, model_size=size)
+  print(f"bf16 speedup: {results['precision']['speedup']:.2f}x - activation memory: {results['precision']['memory_ratio']:.2f}x of fp32 "
+        f"- final loss rel. diff: {results['precision']['final_loss_rel_diff']:.3f} "
+        f"({'matches' if results['precision']['converges'] else 'DIVERGES from'} fp32 within {results['precision']['tol']:.0%})")
+  save_results(results, bench_path)
+  print(json.dumps(results, indent=2))
+  if os.path.exists(baseline_path):
+    print(compare_results(load_results(baseline_path), results))
@@ -0,0 +1,139 @@
+"""Early-exit cascade: binary_Classification first, build_unet only when needed.
+
+    cascade = Cascade(classifier, ynet, device, band=(0.2, 0.8),
+                      ynet_mean=IMAGENET_MEAN, ynet_std=IMAGENET_STD)
+    for result in cascade.predict(paths, want_mask=lambda path: False):
+        ...
+
+Every image is decoded once and run through the cheap classifier. Images
+whose label probability falls inside the confidence ``band`` (exclusive on
+both ends), or for which ``want_mask(path)`` is true, are sent on to Y-Net in
+one batch per classifier batch; Y-Net's label then replaces the classifier's
+and the mask is returned. Everything else exits after the classifier.
+
+The two models were trained with different input normalization, so the
+decoded uint8 images are normalized separately for each (``classifier_mean``
+/ ``ynet_mean``). Forward time of both stages is accumulated in
+CascadeStats; compare_with_ynet runs Y-Net on every image as the reference
+and reports compute saved and accuracy of both pipelines.
+"""
+
+import time
+from collections import namedtuple
+import numpy as np
+import torch
+
+from inference_engine import InferenceEngine, to_input_batch, split_outputs
+
+""" source: "classifier" or "ynet"; mask: (H, W) float32 probabilities, None when Y-Net did not run """
+CascadeResult = namedtuple("CascadeResult", ["name", "path", "label", "source", "mask"])
+
+
+class CascadeStats:
+    def __init__(self):
+        self.n_samples = 0
+        self.n_escalated = 0
+        self.classifier_time = 0.0
+        self.ynet_time = 0.0
+
+    @property
+    def escalation_rate(self):
+        return self.n_escalated / self.n_samples if self.n_samples else 0.0
+
+    def compute_saved(self, ynet_time_per_sample):
+        """ Fraction of model time saved against running Y-Net on every sample """
+        baseline = ynet_time_per_sample * self.n_samples
+        if baseline <= 0:
+            return 0.0
+        return 1.0 - (self.classifier_time + self.ynet_time) / baseline
+
+
+class Cascade:
+    def __init__(self, classifier, ynet, device, size=(256, 256), band=(0.2, 0.8), batch_size=32, num_workers=4,
+                 classifier_mean=None, classifier_std=None, ynet_mean=None, ynet_std=None):
+        low, high = band
+        if not 0.0 <= low <= high <= 1.0:
+            raise ValueError(f"band must satisfy 0 <= low <= high <= 1, got {band}")
+        self.classifier = classifier
+        self.ynet = ynet
+        self.device = device
+        self.band = band
+        self.ynet_mean, self.ynet_std = ynet_mean, ynet_std
+        self.engine = InferenceEngine(classifier, device, size=size, batch_size=batch_size, num_workers=num_workers,
+                                      mean=classifier_mean, std=classifier_std)
+        self.stats = CascadeStats()
+
+    def uncertain(self, prob):
+        low, high = self.band
+        return low < prob < high
+
+    def _escalate(self, preds):
+        """ Y-Net on the escalated predictions -> (mask probabilities, label probabilities) """
+        x = to_input_batch([p.image for p in preds], self.device, self.ynet_mean, self.ynet_std)
+        with torch.inference_mode():
+            t0 = time.perf_counter()
+            masks, labels = split_outputs(self.ynet(x))
+            self.stats.ynet_time += time.perf_counter() - t0
+        return masks, labels
+
+    def _flush(self, batch, want_mask):
+        escalate = [i for i, p in enumerate(batch)
+                    if self.uncertain(p.label) or (want_mask is not None and want_mask(p.path))]
+        masks, labels = self._escalate([batch[i] for i in escalate]) if escalate else (None, None)
+        refined = {i: j for j, i in enumerate(escalate)}
+        self.stats.n_samples += len(batch)
+        self.stats.n_escalated += len(escalate)
+        for i, p in enumerate(batch):
+            j = refined.get(i)
+            if j is None:
+                yield CascadeResult(p.name, p.path, p.label, "classifier", None)
+            else:
+                mask = masks[j] if masks is not None else None
+                yield CascadeResult(p.name, p.path, float(labels[j]), "ynet", mask)
+
+    def predict(self, paths, want_mask=None):
+        """ Yield one CascadeResult per path, in input order; want_mask(path) -> bool forces Y-Net """
+        self.ynet.eval()
+        forward_before = self.engine.stats.forward_time
+        batch = []
+        for pred in self.engine.predict(paths):
+            batch.append(pred)
+            if len(batch) == self.engine.batch_size:
+                yield from self._flush(batch, want_mask)
+                batch = []
+        if batch:
+            yield from self._flush(batch, want_mask)
+        self.stats.classifier_time += self.engine.stats.forward_time - forward_before
+
+    def run(self, paths, want_mask=None):
+        return list(self.predict(paths, want_mask))
+
+
+def compare_with_ynet(cascade, paths, labels, threshold=0.5):
+    """ Run the cascade and Y-Net alone on the same images; accuracy of both and compute saved """
+    labels = np.asarray(labels).astype(int)
+    cascade.stats = CascadeStats()
+    results = cascade.run(paths)
+    cascade_pred = np.array([r.label > threshold for r in results], dtype=int)
+
+    reference = InferenceEngine(cascade.ynet, cascade.device, size=cascade.engine.size,
+                                batch_size=cascade.engine.batch_size, num_workers=cascade.engine.num_workers,
+                                mean=cascade.ynet_mean, std=cascade.ynet_std)
+    ynet_pred = np.array([p.label > threshold for p in reference.predict(paths)], dtype=int)
+    ynet_time_per_sample = reference.stats.forward_time / max(reference.stats.n_samples, 1)
+
+    return {
+        "n_samples": len(results),
+        "band": list(cascade.band),
+        "escalation_rate": cascade.stats.escalation_rate,
+        "compute_saved": cascade.stats.compute_saved(ynet_time_per_sample),
+        "cascade_accuracy": float((cascade_pred == labels).mean()),
+        "ynet_accuracy": float((ynet_pred == labels).mean()),
+        "agreement": float((cascade_pred == ynet_pred).mean()),
+    }
+
+
+def format_cascade(report):
+    return (f"Band {tuple(report['band'])}: {100 * report['escalation_rate']:.1f}% sent to Y-Net - "
+            f"compute saved: {100 * report['compute_saved']:.1f}% - accuracy: {report['cascade_accuracy']:.4f} "
+            f"(Y-Net only: {report['ynet_accuracy']:.4f}, agreement: {report['agreement']:.4f})")
@@ -0,0 +1,186 @@
+"""Resumable training checkpoints, written in the background.
+
+    manager = CheckpointManager("/content/drive/.../ynet_run", keep=3, best_path=checkpoint_path)
+    start_epoch = manager.resume(model, optimizer, scheduler) if resume else 0
+    for epoch in range(start_epoch, num_epochs):
+        ...
+        manager.save(epoch + 1, valid_loss, model, optimizer, scheduler, history=...)
+    manager.close()
+
+save() takes a CPU copy of the model, optimizer, scheduler (e.g.
+ReduceLROnPlateau) and python / numpy / torch RNG states on the training
+thread, then a single background thread writes it, so the next epoch starts
+while the file goes to the (slow) mounted drive. Every file is written to a
+temporary name and renamed into place, so an interrupted write never
+replaces a good checkpoint.
+
+Layout of ``directory``:
+    last.pt                 newest snapshot, used by resume()
+    epoch-0012.pt, ...      the ``keep`` snapshots with the lowest validation loss
+    checkpoints.json        epochs and losses of the retained snapshots
+
+``best_path`` (optional) additionally receives the plain model state_dict
+whenever the validation loss improves, which is what the evaluation cells load.
+"""
+
+import os
+import json
+import copy
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import torch
+
+MANIFEST_NAME = "checkpoints.json"
+
+
+def _to_cpu(obj):
+    """ Detached CPU copies of every tensor in a nested state dict """
+    if torch.is_tensor(obj):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: _to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_to_cpu(v) for v in obj)
+    return copy.deepcopy(obj)
+
+
+def rng_state():
+    state = {"python": random.getstate(), "numpy": np.random.get_state(), "torch": torch.get_rng_state()}
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    """ Both only accept CPU ByteTensors, whatever map_location the snapshot was loaded with """
+    torch.set_rng_state(state["torch"].cpu())
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all([s.cpu() for s in state["cuda"]])
+
+
+def atomic_save(obj, path):
+    """ torch.save to a temporary file in the same directory, fsync, then rename over path """
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        torch.save(obj, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class CheckpointManager:
+    def __init__(self, directory, keep=3, best_path=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.keep = keep
+        self.best_path = best_path
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.lock = threading.Lock()
+        self.pending = []
+        self.resumed_extra = {}
+        """ A new run starts with no retained checkpoints; resume() picks up the previous run's """
+        self.entries = []
+        self.best_loss = float("inf")
+
+    @property
+    def last_path(self):
+        return os.path.join(self.directory, "last.pt")
+
+    def _read_manifest(self):
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return json.load(f)["checkpoints"]
+
+    def _write_manifest(self):
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"checkpoints": self.entries}, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def save(self, epoch, valid_loss, model, optimizer, scheduler=None, **extra):
+        """ Snapshot after ``epoch`` completed epochs; returns True when valid_loss is a new best """
+        snapshot = {
+            "epoch": epoch,
+            "valid_loss": float(valid_loss),
+            "model": _to_cpu(model.state_dict()),
+            "optimizer": _to_cpu(optimizer.state_dict()),
+            "scheduler": _to_cpu(scheduler.state_dict()) if scheduler is not None else None,
+            "rng": rng_state(),
+            "extra": _to_cpu(extra),
+        }
+        improved = valid_loss < self.best_loss
+        if improved:
+            self.best_loss = float(valid_loss)
+        self._check_errors()
+        self.pending.append(self.pool.submit(self._write, snapshot, improved))
+        return improved
+
+    def _write(self, snapshot, improved):
+        atomic_save(snapshot, self.last_path)
+        if improved and self.best_path is not None:
+            atomic_save(snapshot["model"], self.best_path)
+
+        with self.lock:
+            """ Keep the top-k by validation loss """
+            ranked = sorted(self.entries + [{"epoch": snapshot["epoch"], "valid_loss": snapshot["valid_loss"]}],
+                            key=lambda e: e["valid_loss"])
+            kept, dropped = ranked[:self.keep], ranked[self.keep:]
+            if any(e["epoch"] == snapshot["epoch"] for e in kept):
+                name = f"epoch-{snapshot['epoch']:04d}.pt"
+                atomic_save(snapshot, os.path.join(self.directory, name))
+            for e in kept:
+                e["path"] = f"epoch-{e['epoch']:04d}.pt"
+            self.entries = kept
+            self._write_manifest()
+            for e in dropped:
+                path = os.path.join(self.directory, f"epoch-{e['epoch']:04d}.pt")
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _check_errors(self):
+        """ Re-raise a failed background write on the training thread """
+        done = [f for f in self.pending if f.done()]
+        self.pending = [f for f in self.pending if not f.done()]
+        for f in done:
+            f.result()
+
+    def wait(self):
+        for f in self.pending:
+            f.result()
+        self.pending = []
+
+    def close(self):
+        self.wait()
+        self.pool.shutdown(wait=True)
+
+    def load(self, path=None, map_location="cpu"):
+        """ The last snapshot (or the one at path) as a dict, None if there is none """
+        path = path or self.last_path
+        if not os.path.exists(path):
+            return None
+        return torch.load(path, map_location=map_location, weights_only=False)
+
+    def resume(self, model, optimizer, scheduler=None):
+        """ Restore model / optimizer / scheduler / RNG from last.pt; returns the epoch to start from
+
+        The snapshot is always loaded on CPU: load_state_dict copies the weights onto the model's device,
+        the optimizer moves its state to its parameters' device, and the RNG states must stay on CPU.
+        """
+        snapshot = self.load(map_location="cpu")
+        if snapshot is None:
+            return 0
+        model.load_state_dict(snapshot["model"])
+        optimizer.load_state_dict(snapshot["optimizer"])
+        if scheduler is not None and snapshot["scheduler"] is not None:
+            scheduler.load_state_dict(snapshot["scheduler"])
+        set_rng_state(snapshot["rng"])
+        self.resumed_extra = snapshot["extra"]
+        self.entries = self._read_manifest()
+        self.best_loss = min((e["valid_loss"] for e in self.entries), default=float("inf"))
+        return snapshot["epoch"]
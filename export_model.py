@@ -0,0 +1,146 @@
+"""Inference-optimized export of build_unet / binary_Classification.
+
+    1. every BatchNorm2d in a conv_block is folded into the Conv2d before it
+       (bn1 -> conv1, bn2 -> conv2) and replaced by an Identity,
+    2. the folded model is traced to TorchScript, frozen, and passed through
+       torch.jit.optimize_for_inference, which fuses Conv2d + ReLU and
+       prepacks the conv weights for the CPU backend,
+    3. the artifact is checked against the eager model on random inputs and
+       the CPU latency of both is reported.
+
+The saved file is loaded with load_exported and called exactly like the
+eager model. export_checkpoint names the artifact after a hash of the
+checkpoint it was exported from (and EXPORT_VERSION), so retraining into the
+same .pth, or a change of the exported outputs, exports a fresh artifact
+instead of reusing a stale one.
+"""
+
+import os
+import copy
+import time
+import hashlib
+import numpy as np
+import torch
+import torch.nn as nn
+
+""" Bumped whenever the exported graph changes meaning; 2: outputs are logits (no baked-in sigmoid) """
+EXPORT_VERSION = 2
+
+
+def fold_conv_bn(conv, bn):
+    """ Conv2d followed by BatchNorm2d (eval statistics) -> one Conv2d """
+    fused = copy.deepcopy(conv)
+    w = conv.weight.detach()
+    b = conv.bias.detach() if conv.bias is not None else torch.zeros(w.shape[0], device=w.device)
+
+    scale = bn.weight.detach() / torch.sqrt(bn.running_var + bn.eps)
+    fused.weight = nn.Parameter(w * scale.reshape(-1, 1, 1, 1))
+    fused.bias = nn.Parameter((b - bn.running_mean) * scale + bn.bias.detach())
+    return fused
+
+
+def fold_batchnorm(model):
+    """ Copy of model with every (convN, bnN) pair folded; bnN becomes an Identity """
+    model = copy.deepcopy(model).eval()
+    n_folded = 0
+    for module in model.modules():
+        for name, child in list(module.named_children()):
+            if not (isinstance(child, nn.BatchNorm2d) and name.startswith("bn")):
+                continue
+            conv = getattr(module, "conv" + name[2:], None)
+            if not isinstance(conv, nn.Conv2d):
+                continue
+            setattr(module, "conv" + name[2:], fold_conv_bn(conv, child))
+            setattr(module, name, nn.Identity())
+            n_folded += 1
+    return model, n_folded
+
+
+def _as_tuple(outputs):
+    return tuple(outputs) if isinstance(outputs, (tuple, list)) else (outputs,)
+
+
+@torch.no_grad()
+def check_equivalence(reference, candidate, example, atol=1e-4, rtol=1e-3):
+    """ Max absolute difference per output; raises if any output is out of tolerance """
+    ref = _as_tuple(reference(example))
+    out = _as_tuple(candidate(example))
+    diffs = []
+    for r, o in zip(ref, out):
+        diffs.append((r.float() - o.float()).abs().max().item())
+        if not torch.allclose(r.float(), o.float(), atol=atol, rtol=rtol):
+            raise AssertionError(f"Exported model differs from eager model: max abs diff {diffs[-1]:.3e}")
+    return diffs
+
+
+@torch.no_grad()
+def measure_latency(model, example, warmup=5, repeats=20):
+    """ Median / p90 wall time of one forward pass, in ms """
+    for _ in range(warmup):
+        model(example)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model(example)
+        times.append((time.perf_counter() - start) * 1000.0)
+    return {"median_ms": float(np.median(times)), "p90_ms": float(np.percentile(times, 90))}
+
+
+def export_for_inference(model, example, path, check=True):
+    """ Fold, trace, freeze, optimize and save model; returns a report dict """
+    eager = copy.deepcopy(model).eval()
+    folded, n_folded = fold_batchnorm(eager)
+
+    with torch.no_grad():
+        traced = torch.jit.trace(folded, example)
+        frozen = torch.jit.freeze(traced)
+        frozen = torch.jit.optimize_for_inference(frozen)
+    """ Rename last so an interrupted export is never picked up """
+    frozen.save(path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+    report = {"path": path, "folded_batchnorms": n_folded}
+    if check:
+        exported = load_exported(path, example.device)
+        """ A different batch size than the trace example, to catch baked-in shapes """
+        probe = torch.randn((example.shape[0] + 1,) + tuple(example.shape[1:]), device=example.device)
+        report["max_abs_diff"] = check_equivalence(eager, exported, probe)
+        report["eager"] = measure_latency(eager, example)
+        report["exported"] = measure_latency(exported, example)
+        report["speedup"] = report["eager"]["median_ms"] / report["exported"]["median_ms"]
+    return report
+
+
+def load_exported(path, device):
+    model = torch.jit.load(path, map_location=device)
+    model.eval()
+    return model
+
+
+def exported_path(checkpoint_path):
+    """ <checkpoint>_frozen-<hash>.pt, the hash covering the checkpoint contents and EXPORT_VERSION """
+    h = hashlib.sha1(f"export-v{EXPORT_VERSION}".encode())
+    with open(checkpoint_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return f"{os.path.splitext(checkpoint_path)[0]}_frozen-{h.hexdigest()[:12]}.pt"
+
+
+def export_checkpoint(model, example, checkpoint_path):
+    """ (exported model, report or None): model holds the weights of checkpoint_path, exported unless
+    an artifact for exactly this checkpoint exists already """
+    path = exported_path(checkpoint_path)
+    report = None
+    if not os.path.exists(path):
+        report = export_for_inference(model, example, path)
+    return load_exported(path, example.device), report
+
+
+def format_report(report):
+    lines = [f"Exported {report['path']} ({report['folded_batchnorms']} BatchNorm layers folded)"]
+    if "eager" in report:
+        diffs = ", ".join(f"{d:.2e}" for d in report["max_abs_diff"])
+        lines.append(f"\tmax abs diff vs eager: {diffs}")
+        lines.append(f"\teager: {report['eager']['median_ms']:.2f} ms - exported: {report['exported']['median_ms']:.2f} ms "
+                     f"- speedup: {report['speedup']:.2f}x")
+    return "\n".join(lines)
@@ -0,0 +1,205 @@
+"""On-disk bottleneck feature cache for head-only training and evaluation of build_unet.
+
+With the encoder frozen (e1..e4 and the bottleneck ``b``), the bottleneck
+tensor of an image never changes, so it is computed once and stored in a
+memory-mapped ``.npy``. Retraining or evaluating the diagnostic branch
+(e5, global_avg, fc1..fc3) then reads ``b`` from the cache instead of running
+the encoder every epoch.
+
+Layout (``<cache_dir>/<encoder hash>/<preprocessing hash>/<chunk>/``):
+    features.npy  float16 / float32 (n, C, h, w) bottleneck features
+    index.json    image key of every row, plus the parameters of the entry
+
+The encoder hash covers the weights and BatchNorm statistics of the encoder
+modules; the preprocessing hash covers the dataset's size, normalization and
+uint8 flag and the stored dtype, like ynet.cache.cache_key. Rows are keyed
+per image by a hash of its (path, size, mtime) signature, so opening the
+cache only stats the files: it runs the encoder on images no chunk holds yet
+and writes them as a new chunk, so adding or replacing one image does not
+recompute the others. Features are
+computed from the dataset's own preprocessing (``dataset[i][0]``), so they
+match training.
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+import torch
+from torch.utils.data import Dataset, DataLoader, Subset
+
+from ynet.cache import build_entry, load_mapped, file_signature
+from ynet.loader import BatchPreparer
+
+FEATURE_CACHE_VERSION = 2
+
+""" build_unet modules that produce the bottleneck ``b`` """
+ENCODER_MODULES = ("e1", "e2", "e3", "e4", "b")
+
+
+def image_key(path):
+    """ Hash of the file's (path, size, mtime) signature: no read of the image itself """
+    return hashlib.sha1(json.dumps(file_signature(path)).encode()).hexdigest()
+
+
+def encoder_hash(model):
+    """ Hash of the encoder parameters and buffers (weights + BatchNorm running stats) """
+    h = hashlib.sha1()
+    for name, tensor in sorted(model.state_dict().items()):
+        if name.split(".")[0] in ENCODER_MODULES:
+            h.update(name.encode())
+            h.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def freeze_encoder(model):
+    """ No gradients for the encoder and BatchNorm statistics kept fixed (see set_encoder_eval) """
+    for name in ENCODER_MODULES:
+        for p in getattr(model, name).parameters():
+            p.requires_grad_(False)
+    return model
+
+
+def set_encoder_eval(model):
+    """ Call after model.train(): the frozen encoder must not update its running statistics """
+    for name in ENCODER_MODULES:
+        getattr(model, name).eval()
+    return model
+
+
+def preprocessing_key(dataset, dtype):
+    """ (hash, parameters) of everything about the dataset's preprocessing that changes the features """
+    params = {
+        "version": FEATURE_CACHE_VERSION,
+        "dataset": type(dataset).__name__,
+        "size": list(getattr(dataset, "size", [])),
+        "image_mean": getattr(dataset, "image_mean", None),
+        "image_std": getattr(dataset, "image_std", None),
+        "uint8": getattr(dataset, "uint8", False),
+        "dtype": np.dtype(dtype).name,
+    }
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16], params
+
+
+@torch.no_grad()
+def build_features(entry_dir, model, dataset, image_hashes, prepare, params, batch_size=16, dtype=np.float16):
+    """ Run the encoder once over the dataset and write features.npy + index.json under entry_dir;
+    prepare(batch) -> (image on device, ...), see dataset_preparer """
+
+    def write(tmp_dir):
+        model.eval()
+        loader = DataLoader(dataset, batch_size=batch_size, shuffle=False)
+        features = None
+        row = 0
+        for batch in loader:
+            b, _ = model.encode(prepare(batch)[0])
+            b = b.float().cpu().numpy()
+            if features is None:
+                features = np.lib.format.open_memmap(os.path.join(tmp_dir, "features.npy"), mode="w+",
+                                                     dtype=dtype, shape=(len(dataset),) + b.shape[1:])
+            features[row:row + len(b)] = b
+            row += len(b)
+        features.flush()
+        shape = list(features.shape)
+        del features
+
+        with open(os.path.join(tmp_dir, "index.json"), "w") as f:
+            json.dump({"params": params, "shape": shape, "hashes": list(image_hashes)}, f)
+
+    build_entry(entry_dir, write)
+
+
+def dataset_preparer(dataset, device):
+    """ BatchPreparer normalizing a uint8 dataset like its float path: image_mean / image_std if it has them
+
+    Takes the dataset itself, not a Subset of it, which would hide those attributes.
+    """
+    return BatchPreparer(device, getattr(dataset, "image_mean", None), getattr(dataset, "image_std", None),
+                         non_blocking=False)
+
+
+class FeatureCache:
+    """ Memory-mapped bottleneck features for images_path, computed only for images not cached yet """
+
+    def __init__(self, cache_dir, model, dataset, images_path, device, batch_size=16, dtype=np.float16):
+        if len(dataset) != len(images_path):
+            raise ValueError(f"{len(images_path)} images but {len(dataset)} dataset samples")
+        self.image_hashes = [image_key(p) for p in images_path]
+        self.encoder_key = encoder_hash(model)
+        self.preprocessing_key, params = preprocessing_key(dataset, dtype)
+        self.path = os.path.join(cache_dir, self.encoder_key, self.preprocessing_key)
+
+        self._load_chunks()
+        missing = {}
+        for i, h in enumerate(self.image_hashes):
+            if h not in self.rows:
+                missing.setdefault(h, i)
+        if missing:
+            chunk = hashlib.sha1("".join(missing).encode()).hexdigest()[:16]
+            os.makedirs(self.path, exist_ok=True)
+            build_features(os.path.join(self.path, chunk), model, Subset(dataset, list(missing.values())),
+                           list(missing), dataset_preparer(dataset, device), params, batch_size, dtype)
+            self._load_chunks()
+
+    def _load_chunks(self):
+        """ rows: image hash -> (chunk, row) over every finished chunk of this entry """
+        self.chunks = []
+        self.rows = {}
+        if not os.path.isdir(self.path):
+            return
+        for name in sorted(os.listdir(self.path)):
+            index_file = os.path.join(self.path, name, "index.json")
+            if name.endswith(".tmp") or not os.path.exists(index_file):
+                continue
+            with open(index_file) as f:
+                hashes = json.load(f)["hashes"]
+            self.chunks.append(load_mapped(os.path.join(self.path, name, "features.npy")))
+            for row, h in enumerate(hashes):
+                self.rows[h] = (len(self.chunks) - 1, row)
+
+    def __len__(self):
+        return len(self.image_hashes)
+
+    def feature(self, index):
+        """ float32 (C, h, w) bottleneck tensor of the index-th image """
+        chunk, row = self.rows[self.image_hashes[index]]
+        return torch.from_numpy(np.asarray(self.chunks[chunk][row], dtype=np.float32))
+
+
+class FeatureDataset(Dataset):
+    """ (bottleneck features, label) pairs served from a FeatureCache """
+
+    def __init__(self, cache, labels):
+        if len(labels) != len(cache):
+            raise ValueError(f"{len(cache)} cached features but {len(labels)} labels")
+        self.cache = cache
+        self.labels = labels
+
+    def __getitem__(self, index):
+        return self.cache.feature(index), self.labels[index]
+
+    def __len__(self):
+        return len(self.cache)
+
+
+def run_head_epoch(model, loader, loss_fn, device, optimizer=None):
+    """ One pass of the diagnostic branch over cached features; returns (mean loss, accuracy) """
+    training = optimizer is not None
+    model.train(training)
+    set_encoder_eval(model)
+    loss_sum, correct, n = 0.0, 0, 0
+    with torch.set_grad_enabled(training):
+        for features, label in loader:
+            features = features.to(device, dtype=torch.float32)
+            label = label.to(device, dtype=torch.float32).reshape(-1, 1)
+            logits = model.classify(features).reshape(-1, 1)
+            loss = loss_fn(logits, label)
+            if training:
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+            loss_sum += loss.item() * len(label)
+            correct += ((logits > 0).float() == label).sum().item()
+            n += len(label)
+    n = max(n, 1)
+    return loss_sum / n, correct / n
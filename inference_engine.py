@@ -0,0 +1,124 @@
+"""Batched test-time inference for build_unet / binary_Classification.
+
+Images are decoded and resized in a background thread pool (cv2 releases the
+GIL), stacked into batches of ``batch_size`` and pushed through the model with
+one forward pass per batch under ``torch.inference_mode``. Results come back
+per sample, in the same order as the input paths.
+"""
+
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+import torch
+
+from stage_timer import null_timer
+from ynet.normalization import normalize, IMAGENET_MEAN, IMAGENET_STD
+
+""" image: resized uint8 (H, W, 3) BGR, mask: (H, W) float32 probabilities or None, label: probability """
+Prediction = namedtuple("Prediction", ["name", "path", "image", "mask", "label"])
+
+
+def load_image(path, size, timer=null_timer):
+    """ Read and resize one image the same way the evaluation loops do """
+    with timer.stage("decode"):
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        raise IOError(f"Could not read image: {path}")
+    with timer.stage("resize"):
+        return cv2.resize(image, size)               ## (H, W, 3)
+
+
+def to_input_batch(images, device, mean=None, std=None, timer=null_timer):
+    """ list of uint8 (H, W, 3) -> normalized float32 (B, 3, H, W) on device """
+    with timer.stage("h2d"):
+        x = torch.from_numpy(np.stack(images)).to(device)
+    with timer.stage("normalize"):
+        x = normalize(x.permute(0, 3, 1, 2), mean, std)    ## (B, 3, H, W)
+    return x
+
+
+def split_outputs(outputs, timer=null_timer):
+    """ Model logits -> (mask probabilities or None, label probabilities), both (B, ...) on CPU """
+    with timer.stage("sigmoid"):
+        if isinstance(outputs, (tuple, list)):
+            mask_logits, label_logits = outputs
+            masks = torch.sigmoid(mask_logits)[:, 0].float().cpu().numpy()   ## (B, H, W)
+        else:
+            masks, label_logits = None, outputs
+        labels = torch.sigmoid(label_logits.reshape(-1).float()).cpu().numpy()
+    return masks, labels
+
+
+class InferenceStats:
+    def __init__(self):
+        self.n_samples = 0
+        self.n_batches = 0
+        self.forward_time = 0.0
+        self.total_time = 0.0
+
+    @property
+    def fps(self):
+        """ End-to-end throughput, including decode and preprocessing """
+        return self.n_samples / self.total_time if self.total_time > 0 else 0.0
+
+    @property
+    def forward_fps(self):
+        return self.n_samples / self.forward_time if self.forward_time > 0 else 0.0
+
+
+class InferenceEngine:
+    def __init__(self, model, device, size=(256, 256), batch_size=16, num_workers=4,
+                 mean=None, std=None, prefetch_batches=2, timer=null_timer):
+        self.model = model
+        self.device = device
+        self.size = size
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.mean = mean
+        self.std = std
+        self.prefetch_batches = prefetch_batches
+        self.timer = timer
+        self.stats = InferenceStats()
+
+    def _load_batch(self, pool, paths):
+        return [pool.submit(load_image, p, self.size, self.timer) for p in paths]
+
+    def predict(self, paths):
+        """ Yield one Prediction per path, in input order """
+        paths = list(paths)
+        batches = [paths[i:i + self.batch_size] for i in range(0, len(paths), self.batch_size)]
+        self.model.eval()
+        start_time = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.num_workers) as pool:
+            """ Keep up to prefetch_batches batches decoding ahead of the model """
+            pending = [self._load_batch(pool, b) for b in batches[:self.prefetch_batches + 1]]
+            for i, batch_paths in enumerate(batches):
+                with self.timer.stage("decode_wait"):
+                    images = [f.result() for f in pending.pop(0)]
+                nxt = i + self.prefetch_batches + 1
+                if nxt < len(batches):
+                    pending.append(self._load_batch(pool, batches[nxt]))
+
+                x = to_input_batch(images, self.device, self.mean, self.std, self.timer)
+                with torch.inference_mode():
+                    t0 = time.perf_counter()
+                    with self.timer.stage("forward"):
+                        outputs = self.model(x)
+                    masks, labels = split_outputs(outputs, self.timer)
+                    self.stats.forward_time += time.perf_counter() - t0
+
+                self.stats.n_batches += 1
+                self.stats.n_samples += len(images)
+                for j, path in enumerate(batch_paths):
+                    name = os.path.basename(path).split(".")[0]
+                    mask = masks[j] if masks is not None else None
+                    yield Prediction(name, path, images[j], mask, float(labels[j]))
+
+                self.stats.total_time = time.perf_counter() - start_time
+
+    def run(self, paths):
+        return list(self.predict(paths))
@@ -0,0 +1,121 @@
+"""Post-training static INT8 quantization (FX graph mode) for CPU deployment.
+
+The model is traced with prepare_fx, observers are calibrated on a subset of
+the validation DriveDataset, and convert_fx swaps conv / linear layers for
+their quantized kernels. The quantized GraphModule is saved as TorchScript
+so it loads without the model source.
+
+compare_quantized evaluates fp32 and int8 side by side on the same loader
+and reports the Dice/Jaccard and accuracy deltas, latency and model size.
+"""
+
+import io
+import copy
+import torch
+from torch.utils.data import DataLoader, Subset
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+from seg_metrics import SegmentationMetrics
+from export_model import measure_latency
+
+
+def default_backend():
+    engines = torch.backends.quantized.supported_engines
+    return "x86" if "x86" in engines else "fbgemm"
+
+
+def calibration_loader(dataset, num_samples=100, batch_size=8, seed=0):
+    """ Random, reproducible subset of dataset for observer calibration """
+    g = torch.Generator().manual_seed(seed)
+    indices = torch.randperm(len(dataset), generator=g)[:num_samples].tolist()
+    return DataLoader(Subset(dataset, indices), batch_size=batch_size, shuffle=False)
+
+
+@torch.no_grad()
+def quantize_model(model, loader, backend=None):
+    """ fp32 model + calibration loader -> quantized GraphModule on CPU """
+    backend = backend or default_backend()
+    torch.backends.quantized.engine = backend
+
+    model = copy.deepcopy(model).cpu().eval()
+    example = next(iter(loader))[0].float()
+    prepared = prepare_fx(model, get_default_qconfig_mapping(backend), example_inputs=(example,))
+    for batch in loader:
+        prepared(batch[0].float())
+    return convert_fx(prepared)
+
+
+def save_quantized(model, example, path):
+    with torch.no_grad():
+        scripted = torch.jit.trace(model, example)
+    scripted.save(path)
+
+
+def load_quantized(path, backend=None):
+    torch.backends.quantized.engine = backend or default_backend()
+    model = torch.jit.load(path, map_location="cpu")
+    model.eval()
+    return model
+
+
+def model_size(model):
+    """ Serialized size in bytes """
+    buffer = io.BytesIO()
+    if isinstance(model, torch.jit.ScriptModule):
+        torch.jit.save(model, buffer)
+    else:
+        torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+@torch.no_grad()
+def _evaluate(model, loader):
+    """ Segmentation metrics (if the model has a mask head) and label accuracy """
+    seg_metrics = SegmentationMetrics(threshold=0.5)
+    correct, total = 0, 0
+    for batch in loader:
+        x, label = batch[0].float(), batch[-1]
+        outputs = model(x)
+        if isinstance(outputs, (tuple, list)):
+            mask_logits, label_logits = outputs
+            seg_metrics.update(torch.sigmoid(mask_logits), batch[1])
+        else:
+            label_logits = outputs
+        pred = (label_logits.reshape(-1) > 0).long()          ## logit > 0 <=> probability > 0.5
+        correct += (pred == label.reshape(-1).long()).sum().item()
+        total += len(pred)
+
+    result = {"accuracy": correct / max(total, 1)}
+    if len(seg_metrics.counts):
+        scores = seg_metrics.compute()["mean"]
+        result["dice"] = scores["f1"]
+        result["jaccard"] = scores["jaccard"]
+    return result
+
+
+def compare_quantized(fp32_model, int8_model, loader):
+    fp32_model = copy.deepcopy(fp32_model).cpu().eval()
+    example = next(iter(loader))[0].float()
+
+    report = {"fp32": _evaluate(fp32_model, loader), "int8": _evaluate(int8_model, loader)}
+    report["delta"] = {k: report["int8"][k] - report["fp32"][k] for k in report["fp32"]}
+    report["fp32"].update(measure_latency(fp32_model, example))
+    report["int8"].update(measure_latency(int8_model, example))
+    report["fp32"]["size_bytes"] = model_size(fp32_model)
+    report["int8"]["size_bytes"] = model_size(int8_model)
+    report["speedup"] = report["fp32"]["median_ms"] / report["int8"]["median_ms"]
+    report["compression"] = report["fp32"]["size_bytes"] / report["int8"]["size_bytes"]
+    return report
+
+
+def format_quantization_report(report):
+    lines = []
+    for kind in ["fp32", "int8"]:
+        r = report[kind]
+        scores = " - ".join(f"{k}: {r[k]:1.4f}" for k in ["dice", "jaccard", "accuracy"] if k in r)
+        lines.append(f"{kind}: {scores} - latency: {r['median_ms']:.2f} ms - size: {r['size_bytes'] / 2**20:.2f} MB")
+    delta = " - ".join(f"{k}: {v:+1.4f}" for k, v in report["delta"].items())
+    lines.append(f"delta (int8 - fp32): {delta}")
+    lines.append(f"speedup: {report['speedup']:.2f}x - size reduction: {report['compression']:.2f}x")
+    return "\n".join(lines)
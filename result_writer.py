@@ -0,0 +1,113 @@
+"""Asynchronous writer for evaluation outputs.
+
+The evaluation loop hands each prediction to ResultWriter.submit and moves
+on to the next batch; PNG encoding and disk writes happen in a small thread
+pool (cv2.imencode / imwrite release the GIL). At most ``max_pending``
+results can be queued: when the writer falls behind, submit blocks until a
+slot frees up, so memory stays bounded and the time spent waiting is
+reported as ``blocked_s``.
+
+    mode="png"      <name>_ynet.png, <name>_ynet_mask.png, <name>_ynet_pred.png
+                    (and <name>_ynet_vis.png side by side with visualize=True)
+    mode="archive"  one <out_dir>/predictions.npz of bit-packed predicted masks,
+                    written when the writer is closed
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+
+from stage_timer import null_timer
+
+
+def to_bgr(mask):
+    """ (H, W) uint8 -> (H, W, 3) """
+    return np.repeat(mask[:, :, None], 3, axis=2)
+
+
+def visualization(image, mask, pred, line_width=10):
+    """ image | ground truth | prediction, separated by grey lines """
+    line = np.full((image.shape[0], line_width, 3), 128, dtype=np.uint8)
+    return np.concatenate([image, line, to_bgr(mask), line, to_bgr(pred * 255)], axis=1)
+
+
+class ResultWriter:
+    def __init__(self, out_dir, mode="png", max_workers=2, max_pending=32, visualize=False, suffix="ynet",
+                 timer=null_timer):
+        if mode not in ("png", "archive"):
+            raise ValueError(f"Unknown mode: {mode}")
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.mode = mode
+        self.visualize = visualize
+        self.suffix = suffix
+        self.timer = timer
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.archive = {}
+        self.errors = []
+        self.n_written = 0
+        self.blocked_s = 0.0
+
+    def submit(self, name, image, mask, pred):
+        """ image: uint8 (H, W, 3), mask: uint8 (H, W) ground truth 0..255, pred: uint8 (H, W) 0 / 1 """
+        start = time.perf_counter()
+        with self.timer.stage("writer_wait"):
+            self.slots.acquire()
+        self.blocked_s += time.perf_counter() - start
+        future = self.pool.submit(self._write, name, image, mask, pred)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self.slots.release()
+        if future.exception() is not None:
+            with self.lock:
+                self.errors.append(future.exception())
+
+    def _write(self, name, image, mask, pred):
+        prefix = os.path.join(self.out_dir, f"{name}_{self.suffix}")
+        if self.mode == "archive":
+            with self.timer.stage("packbits"):
+                packed = np.packbits(pred.reshape(-1) > 0)
+            with self.lock:
+                self.archive[name] = (packed, pred.shape)
+        else:
+            with self.timer.stage("imwrite"):
+                cv2.imwrite(f"{prefix}.png", image)
+                cv2.imwrite(f"{prefix}_mask.png", mask)
+                cv2.imwrite(f"{prefix}_pred.png", pred * 255)
+        if self.visualize:
+            with self.timer.stage("imwrite"):
+                cv2.imwrite(f"{prefix}_vis.png", visualization(image, mask, pred))
+        with self.lock:
+            self.n_written += 1
+
+    def close(self):
+        """ Wait for pending writes, write the archive, re-raise the first write error """
+        self.pool.shutdown(wait=True)
+        if self.mode == "archive" and self.archive:
+            names = sorted(self.archive)
+            np.savez(os.path.join(self.out_dir, "predictions.npz"),
+                     names=np.array(names),
+                     shapes=np.array([self.archive[n][1] for n in names]),
+                     **{f"pred_{i}": self.archive[n][0] for i, n in enumerate(names)})
+        if self.errors:
+            raise self.errors[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_archive(path):
+    """ predictions.npz -> {name: uint8 (H, W) 0 / 1 mask} """
+    with np.load(path) as data:
+        names, shapes = data["names"].tolist(), data["shapes"]
+        return {name: np.unpackbits(data[f"pred_{i}"], count=int(np.prod(shapes[i]))).reshape(shapes[i])
+                for i, name in enumerate(names)}
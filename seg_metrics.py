@@ -0,0 +1,84 @@
+"""Streaming confusion-count metrics for binary segmentation.
+
+Instead of flattening every mask to numpy and calling sklearn five times per
+image, SegmentationMetrics keeps per-image TP/FP/FN/TN counts as tensors,
+updated with a single bincount per batch. Scores are derived from the counts:
+averaged over images (``mean``) and from the summed counts over the whole
+dataset (``micro``).
+"""
+
+import torch
+
+METRIC_NAMES = ["jaccard", "f1", "recall", "precision", "accuracy", "iou"]
+
+
+def confusion_counts(y_pred, y_true, threshold=0.5):
+    """ (B, ...) predictions and targets -> int64 (B, 4) counts of [TP, FP, FN, TN] per image """
+    pred = (y_pred > threshold).reshape(y_pred.shape[0], -1).long()
+    true = (y_true > threshold).reshape(y_true.shape[0], -1).long()
+    B = pred.shape[0]
+
+    """ code = 0: TN, 1: FN, 2: FP, 3: TP ; offset by 4 per image so one bincount covers the batch """
+    code = pred * 2 + true + 4 * torch.arange(B, device=pred.device).unsqueeze(1)
+    counts = torch.bincount(code.reshape(-1), minlength=4 * B).view(B, 4)
+    return counts[:, [3, 2, 1, 0]]
+
+
+def _safe_div(num, den):
+    """ 0 where the denominator is 0, like sklearn's zero_division default """
+    return torch.where(den > 0, num / den.clamp(min=1), torch.zeros_like(num))
+
+
+def scores_from_counts(counts):
+    """ int64 (..., 4) [TP, FP, FN, TN] -> dict of float64 tensors (...) """
+    tp, fp, fn, tn = counts.double().unbind(-1)
+    fg_iou = _safe_div(tp, tp + fp + fn)
+    bg_iou = _safe_div(tn, tn + fp + fn)
+    return {
+        "jaccard": fg_iou,
+        "f1": _safe_div(2 * tp, 2 * tp + fp + fn),      ## == Dice
+        "recall": _safe_div(tp, tp + fn),
+        "precision": _safe_div(tp, tp + fp),
+        "accuracy": _safe_div(tp + tn, tp + fp + fn + tn),
+        "iou": (fg_iou + bg_iou) / 2,                   ## mean IoU over foreground and background
+    }
+
+
+class SegmentationMetrics:
+    def __init__(self, threshold=0.5):
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self._counts = []
+
+    @torch.no_grad()
+    def update(self, y_pred, y_true):
+        """ y_pred: probabilities (B, 1, H, W), y_true: targets of the same shape """
+        self._counts.append(confusion_counts(y_pred, y_true, self.threshold).cpu())
+
+    @property
+    def counts(self):
+        """ int64 (N, 4) [TP, FP, FN, TN] for every image seen so far """
+        if not self._counts:
+            return torch.zeros(0, 4, dtype=torch.int64)
+        return torch.cat(self._counts)
+
+    def compute(self):
+        counts = self.counts
+        per_image = scores_from_counts(counts)
+        micro = scores_from_counts(counts.sum(0))
+        return {
+            "per_image": per_image,
+            "mean": {k: v.mean().item() if len(v) else 0.0 for k, v in per_image.items()},
+            "micro": {k: v.item() for k, v in micro.items()},
+        }
+
+    def summary(self):
+        result = self.compute()
+        lines = []
+        for kind in ["mean", "micro"]:
+            s = result[kind]
+            lines.append(f"{kind:>5}: Jaccard: {s['jaccard']:1.4f} - F1/Dice: {s['f1']:1.4f} - Recall: {s['recall']:1.4f} - "
+                         f"Precision: {s['precision']:1.4f} - Acc: {s['accuracy']:1.4f} - IoU: {s['iou']:1.4f}")
+        return "\n".join(lines)
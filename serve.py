@@ -0,0 +1,277 @@
+"""Local HTTP inference server with dynamic batching.
+
+    python serve.py --model YNETcheckpoint1200_frozen-<hash>.pt --port 8000
+
+Endpoints:
+    POST /predict[?mask=rle|png|none]   body: encoded image bytes (jpg/png)
+    GET  /metrics                       latency / throughput counters (JSON)
+    GET  /healthz
+
+Uploads are decoded and resized in a thread pool, queued, and a single model
+worker thread coalesces them into batches of up to ``max_batch_size``,
+waiting at most ``max_wait_ms`` after the first request of a batch. The
+response carries the NV label probability and, for Y-Net models, the
+predicted mask at the upload's resolution as RLE or base64 PNG.
+
+Any model with the build_unet / binary_Classification call signature works;
+the CLI loads an artifact written by export_model.export_checkpoint.
+"""
+
+import json
+import time
+import base64
+import queue
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import cv2
+import torch
+
+from inference_engine import to_input_batch, split_outputs, IMAGENET_MEAN, IMAGENET_STD
+
+
+def rle_encode(mask):
+    """ Binary (H, W) mask -> run lengths over the row-major pixels, starting with a run of 0s """
+    flat = np.asarray(mask, dtype=np.uint8).reshape(-1)
+    change = np.flatnonzero(np.diff(flat)) + 1
+    bounds = np.concatenate([[0], change, [flat.size]])
+    counts = np.diff(bounds).tolist()
+    if flat.size and flat[0] == 1:
+        counts = [0] + counts
+    return {"size": list(mask.shape), "counts": counts}
+
+
+def rle_decode(rle):
+    values = np.arange(len(rle["counts"])) % 2
+    flat = np.repeat(values.astype(np.uint8), rle["counts"])
+    return flat.reshape(rle["size"])
+
+
+def decode_upload(data, size):
+    """ Encoded image bytes -> (resized uint8 (H, W, 3), original (h, w)); ValueError (HTTP 400) if undecodable """
+    if not data:
+        raise ValueError("Empty request body")
+    try:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    except cv2.error as e:
+        raise ValueError(f"Could not decode image: {e}") from e
+    if image is None:
+        raise ValueError("Could not decode image")
+    return cv2.resize(image, size), image.shape[:2]
+
+
+class ServerMetrics:
+    def __init__(self, window=2048):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batch_sizes = deque(maxlen=window)
+        self.latencies_ms = deque(maxlen=window)
+        self.forward_ms = deque(maxlen=window)
+
+    def record_batch(self, n, forward_ms):
+        with self.lock:
+            self.batches += 1
+            self.batch_sizes.append(n)
+            self.forward_ms.append(forward_ms)
+
+    def record_request(self, latency_ms, ok=True):
+        with self.lock:
+            self.requests += 1
+            self.errors += 0 if ok else 1
+            self.latencies_ms.append(latency_ms)
+
+    def snapshot(self, queue_depth=0):
+        with self.lock:
+            uptime = time.time() - self.started
+            lat = np.array(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+            fwd = np.array(self.forward_ms) if self.forward_ms else np.zeros(1)
+            return {
+                "uptime_s": uptime,
+                "requests": self.requests,
+                "errors": self.errors,
+                "batches": self.batches,
+                "queue_depth": queue_depth,
+                "throughput_rps": self.requests / uptime if uptime > 0 else 0.0,
+                "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+                "latency_ms": {f"p{q}": float(np.percentile(lat, q)) for q in (50, 90, 99)},
+                "forward_ms": {f"p{q}": float(np.percentile(fwd, q)) for q in (50, 90, 99)},
+            }
+
+
+class BatchingPredictor:
+    def __init__(self, model, device, size=(256, 256), mean=None, std=None,
+                 max_batch_size=16, max_wait_ms=10.0, decode_workers=4):
+        self.model = model.eval()
+        self.device = device
+        self.size = size
+        self.mean = mean
+        self.std = std
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.pool = ThreadPoolExecutor(max_workers=decode_workers)
+        self.queue = queue.Queue()
+        self.metrics = ServerMetrics()
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="model-worker", daemon=True)
+        self._worker.start()
+
+    def submit(self, data):
+        """ Encoded image bytes -> Future of (mask probabilities or None, label probability, original (h, w)) """
+        result = Future()
+
+        def decode():
+            try:
+                image, shape = decode_upload(data, self.size)
+            except Exception as e:
+                result.set_exception(e)
+                return
+            self.queue.put((image, shape, result))
+
+        self.pool.submit(decode)
+        return result
+
+    def _collect(self):
+        """ Block for the first request, then fill the batch until it is full or max_wait has passed """
+        try:
+            items = [self.queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while not self._stop.is_set():
+            items = self._collect()
+            if not items:
+                continue
+            try:
+                x = to_input_batch([i[0] for i in items], self.device, self.mean, self.std)
+                start = time.perf_counter()
+                with torch.inference_mode():
+                    masks, labels = split_outputs(self.model(x))
+                self.metrics.record_batch(len(items), (time.perf_counter() - start) * 1000.0)
+            except Exception as e:
+                for item in items:
+                    item[2].set_exception(e)
+                continue
+            for j, (_, shape, result) in enumerate(items):
+                mask = masks[j] if masks is not None else None
+                result.set_result((mask, float(labels[j]), shape))
+
+    def close(self):
+        self._stop.set()
+        self._worker.join()
+        self.pool.shutdown()
+
+
+def encode_mask(mask, shape, fmt):
+    """ (H, W) probabilities -> JSON-able mask at the original (h, w) resolution """
+    if mask is None or fmt == "none":
+        return None
+    binary = cv2.resize((mask > 0.5).astype(np.uint8), (shape[1], shape[0]), interpolation=cv2.INTER_NEAREST)
+    if fmt == "png":
+        ok, png = cv2.imencode(".png", binary * 255)
+        return {"format": "png", "data": base64.b64encode(png.tobytes()).decode("ascii")}
+    return dict(format="rle", **rle_encode(binary))
+
+
+class PredictHandler(BaseHTTPRequestHandler):
+    predictor = None
+    timeout_s = 30.0
+
+    def _send_json(self, code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/metrics":
+            self._send_json(200, self.predictor.metrics.snapshot(self.predictor.queue.qsize()))
+        elif path == "/healthz":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/predict":
+            self._send_json(404, {"error": "not found"})
+            return
+        start = time.perf_counter()
+        fmt = parse_qs(url.query).get("mask", ["rle"])[0]
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            mask, label, shape = self.predictor.submit(data).result(timeout=self.timeout_s)
+        except ValueError as e:
+            self.predictor.metrics.record_request((time.perf_counter() - start) * 1000.0, ok=False)
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self.predictor.metrics.record_request((time.perf_counter() - start) * 1000.0, ok=False)
+            self._send_json(500, {"error": str(e)})
+            return
+
+        payload = {"label_prob": label, "label": int(label > 0.5), "mask": encode_mask(mask, shape, fmt)}
+        self.predictor.metrics.record_request((time.perf_counter() - start) * 1000.0)
+        self._send_json(200, payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(predictor, host="127.0.0.1", port=8000):
+    """ port=0 picks a free port, see server.server_address """
+    handler = type("Handler", (PredictHandler,), {"predictor": predictor})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dynamic-batching inference server")
+    parser.add_argument("--model", required=True, help="TorchScript artifact from export_model")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--decode-workers", type=int, default=4)
+    parser.add_argument("--no-normalize", action="store_true", help="binary_Classification takes un-normalized input")
+    args = parser.parse_args()
+
+    device = torch.device("cpu")
+    model = torch.jit.load(args.model, map_location=device)
+    mean, std = (None, None) if args.no_normalize else (IMAGENET_MEAN, IMAGENET_STD)
+    predictor = BatchingPredictor(model, device, size=(args.size, args.size), mean=mean, std=std,
+                                  max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms,
+                                  decode_workers=args.decode_workers)
+    server = make_server(predictor, args.host, args.port)
+    print(f"Serving on http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        predictor.close()
+
+
+if __name__ == "__main__":
+    main()
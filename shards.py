@@ -0,0 +1,178 @@
+"""Sharded tar streaming dataset, an alternative to glob-over-directories.
+
+Packing joins the label CSV to the image (and mask) files by sample id (see
+ynet.manifest.Manifest) and writes the triples into a few large tar shards:
+
+    python shards.py --images .../TrainImages925 --masks .../TrainMasks925 \\
+        --csv .../TrainLabels.csv --out /content/shards/train --samples-per-shard 500
+
+Each sample is stored as consecutive members ``<id>.<ext>`` (original image
+bytes), ``<id>.mask.png`` and ``<id>.cls`` (the label), and an index file
+``<out>/index.json`` records the shards and their sample counts.
+
+ShardDataset streams those shards sequentially, so reading from a network /
+FUSE mount costs one open per shard instead of one per file. Shards are split
+across DataLoader workers (and distributed ranks), shard order is reshuffled
+every epoch, and samples are mixed through a shuffle buffer.
+"""
+
+import os
+import io
+import json
+import random
+import tarfile
+import argparse
+import numpy as np
+import cv2
+import torch
+from torch.utils.data import IterableDataset, get_worker_info
+
+from ynet.normalization import normalize
+from ynet.manifest import Manifest
+
+INDEX_NAME = "index.json"
+
+
+def _add_bytes(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def pack_shards(manifest, out_dir, samples_per_shard=500, prefix="shard"):
+    """ Write the manifest's samples into <out_dir>/<prefix>-000000.tar, ... and an index.json; returns the index """
+    os.makedirs(out_dir, exist_ok=True)
+    masks = manifest.masks if manifest.masks is not None else [None] * len(manifest)
+    samples = list(zip(manifest.ids, manifest.images, masks, manifest.labels))
+    shards = []
+    for start in range(0, len(samples), samples_per_shard):
+        name = f"{prefix}-{len(shards):06d}.tar"
+        chunk = samples[start:start + samples_per_shard]
+        tmp = os.path.join(out_dir, name + ".tmp")
+        with tarfile.open(tmp, "w") as tar:
+            for sid, image_path, mask_path, label in chunk:
+                ext = os.path.splitext(image_path)[1].lstrip(".").lower() or "jpg"
+                with open(image_path, "rb") as f:
+                    _add_bytes(tar, f"{sid}.{ext}", f.read())
+                if mask_path is not None:
+                    with open(mask_path, "rb") as f:
+                        _add_bytes(tar, f"{sid}.mask.png", f.read())
+                _add_bytes(tar, f"{sid}.cls", str(label).encode())
+        os.replace(tmp, os.path.join(out_dir, name))
+        shards.append({"path": name, "n_samples": len(chunk)})
+
+    index = {"shards": shards, "n_samples": len(samples), "has_masks": samples[0][2] is not None if samples else False}
+    with open(os.path.join(out_dir, INDEX_NAME), "w") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+def iter_shard(path):
+    """ Stream one tar shard -> dicts {"id", "image", "mask", "label"} of raw bytes / int """
+    sample = None
+    with tarfile.open(path, "r|") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            sid, _, kind = member.name.partition(".")
+            if sample is None or sample["id"] != sid:
+                if sample is not None:
+                    yield sample
+                sample = {"id": sid, "image": None, "mask": None, "label": None}
+            data = tar.extractfile(member).read()
+            if kind == "cls":
+                sample["label"] = int(data)
+            elif kind == "mask.png":
+                sample["mask"] = data
+            else:
+                sample["image"] = data
+    if sample is not None:
+        yield sample
+
+
+class ShardDataset(IterableDataset):
+    """ Streaming counterpart of DriveDataset; yields (image, mask, label) or (image, label) """
+
+    def __init__(self, shard_dir, size=(256, 256), with_masks=True, shuffle_buffer=256, seed=0,
+                 image_mean=None, image_std=None, mask_mean=None, mask_std=None):
+        with open(os.path.join(shard_dir, INDEX_NAME)) as f:
+            self.index = json.load(f)
+        self.shards = [os.path.join(shard_dir, s["path"]) for s in self.index["shards"]]
+        self.size = size
+        self.with_masks = with_masks and self.index["has_masks"]
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.epoch = 0
+        self.image_mean, self.image_std = image_mean, image_std
+        self.mask_mean, self.mask_std = mask_mean, mask_std
+
+    def __len__(self):
+        return self.index["n_samples"]
+
+    def set_epoch(self, epoch):
+        """ Call before each epoch so shard order and shuffle buffer change between epochs """
+        self.epoch = epoch
+
+    def _my_shards(self):
+        """ Shuffle shard order per epoch, then split across distributed ranks and loader workers """
+        shards = list(self.shards)
+        rng = random.Random(self.seed + self.epoch)
+        if self.shuffle_buffer > 0:
+            rng.shuffle(shards)
+        if torch.distributed.is_available() and torch.distributed.is_initialized():
+            shards = shards[torch.distributed.get_rank()::torch.distributed.get_world_size()]
+        worker = get_worker_info()
+        if worker is not None:
+            shards = shards[worker.id::worker.num_workers]
+        return shards
+
+    def _decode(self, sample):
+        image = cv2.imdecode(np.frombuffer(sample["image"], dtype=np.uint8), cv2.IMREAD_COLOR)
+        image = cv2.resize(image, self.size, interpolation=cv2.INTER_NEAREST)      ## (H, W, 3)
+        image = normalize(torch.from_numpy(np.ascontiguousarray(np.transpose(image, (2, 0, 1)))),
+                          self.image_mean, self.image_std)                         ## (3, H, W)
+        if not self.with_masks:
+            return image, sample["label"]
+
+        mask = cv2.imdecode(np.frombuffer(sample["mask"], dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        mask = cv2.resize(mask, self.size, interpolation=cv2.INTER_NEAREST)        ## (H, W)
+        mask = normalize(torch.from_numpy(mask[None]), self.mask_mean, self.mask_std)        ## (1, H, W)
+        return image, mask, sample["label"]
+
+    def __iter__(self):
+        worker = get_worker_info()
+        rng = random.Random(self.seed * 1000003 + self.epoch * 1009 + (worker.id if worker else 0))
+        buffer = []
+        for shard in self._my_shards():
+            for sample in iter_shard(shard):
+                if self.shuffle_buffer <= 1:
+                    yield self._decode(sample)
+                    continue
+                buffer.append(sample)
+                if len(buffer) >= self.shuffle_buffer:
+                    i = rng.randrange(len(buffer))
+                    buffer[i], buffer[-1] = buffer[-1], buffer[i]
+                    yield self._decode(buffer.pop())
+        rng.shuffle(buffer)
+        for sample in buffer:
+            yield self._decode(sample)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack image/mask/label triples into tar shards")
+    parser.add_argument("--images", required=True)
+    parser.add_argument("--masks", default=None)
+    parser.add_argument("--csv", required=True)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--samples-per-shard", type=int, default=500)
+    parser.add_argument("--id-column", default="image")
+    parser.add_argument("--label-column", default="NV")
+    args = parser.parse_args()
+
+    manifest = Manifest.build(args.images, args.csv, args.masks, args.id_column, args.label_column)
+    index = pack_shards(manifest, args.out, args.samples_per_shard)
+    print(f"Packed {index['n_samples']} samples into {len(index['shards'])} shards in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Per-stage wall-time breakdown for the evaluation pipeline.
+
+    timer = StageTimer()
+    with timer.stage("decode"):
+        image = cv2.imread(path)
+    ...
+    print(timer.table())                    # count, total, mean, p50 / p95 / p99 per stage
+    timer.export_chrome_trace("trace.json") # open in chrome://tracing or ui.perfetto.dev
+
+Stages are timed with time.perf_counter_ns (monotonic, high resolution) and
+may run on several threads at once, e.g. decode in the InferenceEngine pool
+or imwrite in the ResultWriter pool; each span records its thread so the
+trace shows them on separate rows. A disabled timer (``StageTimer(False)``
+or ``null_timer``) hands out a shared no-op context, so instrumented code
+does not need ``if timer`` checks.
+
+With ``sync_cuda=True`` every span boundary calls torch.cuda.synchronize, so
+asynchronous kernels and copies are charged to the stage that launched them.
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import nullcontext
+import numpy as np
+
+_NULL = nullcontext()
+
+
+class _Span:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer._sync()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer._sync()
+        self.timer.record(self.name, self.start, time.perf_counter_ns())
+
+
+class StageTimer:
+    def __init__(self, enabled=True, sync_cuda=False):
+        self.enabled = enabled
+        self.sync_cuda = sync_cuda
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ spans: (name, start_ns, end_ns, thread id) """
+        self.spans = []
+        self.origin = time.perf_counter_ns()
+
+    def _sync(self):
+        if self.sync_cuda:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+
+    def stage(self, name):
+        """ Context manager timing one occurrence of ``name`` """
+        if not self.enabled:
+            return _NULL
+        return _Span(self, name)
+
+    def record(self, name, start_ns, end_ns):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.spans.append((name, start_ns, end_ns, threading.get_ident()))
+
+    def durations(self):
+        """ {stage: float64 array of durations in ms}, stages in order of first appearance """
+        result = {}
+        for name, start, end, _ in self.spans:
+            result.setdefault(name, []).append((end - start) / 1e6)
+        return {name: np.asarray(d, dtype=np.float64) for name, d in result.items()}
+
+    def summary(self):
+        """ {stage: {"count", "total_ms", "mean_ms", "p50_ms", "p95_ms", "p99_ms"}} """
+        summary = {}
+        for name, d in self.durations().items():
+            p50, p95, p99 = np.percentile(d, [50, 95, 99])
+            summary[name] = {"count": int(d.size), "total_ms": float(d.sum()), "mean_ms": float(d.mean()),
+                             "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+        return summary
+
+    def table(self):
+        summary = self.summary()
+        grand_total = sum(s["total_ms"] for s in summary.values()) or 1.0
+        lines = [f"{'stage':<14} {'count':>6} {'total ms':>10} {'share':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}"]
+        for name, s in summary.items():
+            lines.append(f"{name:<14} {s['count']:>6} {s['total_ms']:>10.1f} {100 * s['total_ms'] / grand_total:>5.1f}% "
+                         f"{s['mean_ms']:>8.3f} {s['p50_ms']:>8.3f} {s['p95_ms']:>8.3f} {s['p99_ms']:>8.3f}")
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, path):
+        """ Complete ("X") events in the Chrome trace-event JSON format, microseconds since reset() """
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for name, start, end, tid in self.spans:
+            threads.setdefault(tid, len(threads))
+            events.append({"name": name, "ph": "X", "pid": pid, "tid": threads[tid],
+                           "ts": (start - self.origin) / 1e3, "dur": (end - start) / 1e3})
+        for tid, index in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": index,
+                           "args": {"name": "main" if tid == threading.main_thread().ident else f"worker-{index}"}})
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+""" Shared disabled timer, the default wherever a timer is optional """
+null_timer = StageTimer(enabled=False)
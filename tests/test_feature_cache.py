@@ -0,0 +1,70 @@
+"""FeatureCache stores the same features for a uint8 dataset as for its float twin."""
+
+import os
+
+import cv2
+import numpy as np
+import torch
+import torch.nn as nn
+
+from feature_cache import FeatureCache
+from ynet.datasets import SegmentationDataset
+
+
+class TinyEncoder(nn.Module):
+    """ encode(x) -> (bottleneck, skips) like build_unet """
+
+    def __init__(self):
+        super().__init__()
+        self.b = nn.Conv2d(3, 4, kernel_size=3, padding=1)
+
+    def encode(self, x):
+        return self.b(x), ()
+
+
+def _write_split(root, n=5, size=24, seed=0):
+    rng = np.random.default_rng(seed)
+    images, masks = [], []
+    for i in range(n):
+        images.append(os.path.join(root, f"image{i}.png"))
+        masks.append(os.path.join(root, f"mask{i}.png"))
+        cv2.imwrite(images[-1], rng.integers(0, 256, (size, size, 3), dtype=np.uint8))
+        cv2.imwrite(masks[-1], (rng.random((size, size)) > 0.5).astype(np.uint8) * 255)
+    return images, masks, [i % 2 for i in range(n)]
+
+
+def test_uint8_dataset_features_are_normalized(tmp_path):
+    images, masks, labels = _write_split(str(tmp_path))
+    device = torch.device("cpu")
+    torch.manual_seed(0)
+    model = TinyEncoder().eval()
+
+    float_dataset = SegmentationDataset(images, masks, labels, size=(16, 16))
+    uint8_dataset = SegmentationDataset(images, masks, labels, size=(16, 16), uint8=True)
+    float_cache = FeatureCache(str(tmp_path / "features"), model, float_dataset, images, device, batch_size=2,
+                               dtype=np.float32)
+    uint8_cache = FeatureCache(str(tmp_path / "features"), model, uint8_dataset, images, device, batch_size=2,
+                               dtype=np.float32)
+    assert float_cache.path != uint8_cache.path
+
+    with torch.no_grad():
+        for i in range(len(images)):
+            expected, _ = model.encode(float_dataset[i][0][None])
+            torch.testing.assert_close(float_cache.feature(i), expected[0], rtol=1e-4, atol=1e-4)
+            torch.testing.assert_close(uint8_cache.feature(i), expected[0], rtol=1e-4, atol=1e-4)
+
+
+def test_new_images_only_add_a_chunk(tmp_path):
+    images, masks, labels = _write_split(str(tmp_path), n=6)
+    device = torch.device("cpu")
+    model = TinyEncoder().eval()
+
+    first = FeatureCache(str(tmp_path / "features"), model, SegmentationDataset(images[:4], masks[:4], labels[:4],
+                         size=(16, 16)), images[:4], device)
+    second = FeatureCache(str(tmp_path / "features"), model, SegmentationDataset(images, masks, labels,
+                          size=(16, 16)), images, device)
+    assert len(first.chunks) == 1 and len(second.chunks) == 2
+    old_chunks = {second.rows[h][0] for h in second.image_hashes[:4]}
+    new_chunks = {second.rows[h][0] for h in second.image_hashes[4:]}
+    assert len(old_chunks) == 1 and len(new_chunks) == 1 and old_chunks != new_chunks
+    assert len(second.chunks[new_chunks.pop()]) == 2
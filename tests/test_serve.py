@@ -0,0 +1,99 @@
+"""Localhost round trip through serve.make_server with a tiny Y-Net-shaped model."""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+
+from serve import BatchingPredictor, make_server, rle_encode, rle_decode
+
+
+class ThresholdModel(nn.Module):
+    """ Mask logits: bright pixels are foreground; label logit: mean brightness above the midpoint """
+
+    def forward(self, x):
+        gray = x.mean(dim=1, keepdim=True)
+        return (gray - 0.5) * 100, (gray.mean(dim=(1, 2, 3)) - 0.5) * 100
+
+
+@pytest.fixture
+def server():
+    predictor = BatchingPredictor(ThresholdModel(), torch.device("cpu"), size=(32, 32),
+                                  max_batch_size=4, max_wait_ms=50.0, decode_workers=2)
+    httpd = make_server(predictor, port=0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", predictor
+    httpd.shutdown()
+    httpd.server_close()
+    predictor.close()
+
+
+def _post(url, data):
+    request = urllib.request.Request(url, data=data, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def _png(image):
+    ok, data = cv2.imencode(".png", image)
+    assert ok
+    return data.tobytes()
+
+
+@pytest.mark.parametrize("mask", [
+    np.zeros((0, 0), dtype=np.uint8),
+    np.zeros((3, 4), dtype=np.uint8),
+    np.ones((3, 4), dtype=np.uint8),
+    np.array([[1, 0, 0, 1], [1, 1, 0, 0]], dtype=np.uint8),
+])
+def test_rle_round_trip(mask):
+    rle = rle_encode(mask)
+    assert sum(rle["counts"]) == mask.size
+    np.testing.assert_array_equal(rle_decode(rle), mask)
+
+
+def test_predict_round_trip(server):
+    url, _ = server
+    image = np.zeros((40, 60, 3), dtype=np.uint8)
+    image[:, 30:] = 255
+    status, payload = _post(url + "/predict", _png(image))
+    assert status == 200
+    assert payload["mask"]["format"] == "rle"
+    mask = rle_decode(payload["mask"])
+    assert mask.shape == (40, 60)
+    assert mask[:, :28].sum() == 0 and mask[:, 32:].all()
+    assert 0.0 <= payload["label_prob"] <= 1.0
+
+
+def test_invalid_bodies_are_bad_requests(server):
+    url, predictor = server
+    for body in [b"", b"not an image"]:
+        status, payload = _post(url + "/predict", body)
+        assert status == 400, payload
+    assert predictor.metrics.snapshot()["errors"] == 2
+
+
+def test_concurrent_requests_are_batched_and_counted(server):
+    url, _ = server
+    body = _png(np.full((32, 32, 3), 200, dtype=np.uint8))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: _post(url + "/predict?mask=none", body), range(8)))
+    assert all(status == 200 and payload["label"] == 1 for status, payload in results)
+
+    with urllib.request.urlopen(url + "/metrics", timeout=30) as response:
+        metrics = json.loads(response.read())
+    assert metrics["requests"] == 8
+    assert metrics["errors"] == 0
+    assert metrics["batches"] < 8
+    assert metrics["mean_batch_size"] > 1
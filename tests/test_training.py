@@ -0,0 +1,91 @@
+"""Gradient accumulation in train_ynet matches one large batch over the same samples."""
+
+import pytest
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, TensorDataset
+
+from ynet.models import JointLogitsLoss
+from ynet.training import train_ynet
+
+
+class TinyYNet(nn.Module):
+    """ (mask logits, label logits) like build_unet, without BatchNorm so micro-batches see the same function """
+
+    def __init__(self):
+        super().__init__()
+        self.seg = nn.Conv2d(3, 1, kernel_size=3, padding=1)
+        self.cls = nn.Linear(3, 1)
+
+    def forward(self, x):
+        return self.seg(x), self.cls(x.mean(dim=(2, 3)))
+
+
+class RecordingSGD(torch.optim.SGD):
+    """ lr=0 keeps the parameters fixed; step() records the gradients it would apply """
+
+    def __init__(self, params):
+        super().__init__(params, lr=0.0)
+        self.steps = []
+
+    def step(self, closure=None):
+        self.steps.append([p.grad.clone() for group in self.param_groups for p in group["params"]])
+        return super().step(closure)
+
+
+def _data(n, seed=0):
+    g = torch.Generator().manual_seed(seed)
+    images = torch.randn(n, 3, 8, 8, generator=g)
+    masks = (torch.rand(n, 1, 8, 8, generator=g) > 0.5).float() * 2 - 1    ## normalized to -1 / 1
+    labels = torch.randint(0, 2, (n,), generator=g)
+    return images, masks, labels
+
+
+def _step_bounds(n, micro_batch_size, effective_batch_size):
+    """ Sample ranges of the optimizer steps train_ynet should take """
+    bounds, start, pending = [], 0, 0
+    for first in range(0, n, micro_batch_size):
+        pending += min(micro_batch_size, n - first)
+        if pending >= (effective_batch_size or pending):
+            bounds.append((start, start + pending))
+            start, pending = start + pending, 0
+    if pending:
+        bounds.append((start, n))
+    return bounds
+
+
+@pytest.mark.parametrize("n, micro_batch_size, effective_batch_size", [
+    (12, 4, None),      # one step per batch
+    (12, 2, 6),         # divisible
+    (10, 4, 8),         # ragged last batch, short final step
+    (10, 3, 4),         # micro-batches do not divide the target
+    (7, 7, 32),         # target larger than the epoch
+])
+def test_accumulated_gradients_match_full_batch(n, micro_batch_size, effective_batch_size):
+    images, masks, labels = _data(n)
+    loss_fn = JointLogitsLoss()
+    device = torch.device("cpu")
+
+    torch.manual_seed(0)
+    model = TinyYNet()
+    optimizer = RecordingSGD(model.parameters())
+    loader = DataLoader(TensorDataset(images, masks, labels), batch_size=micro_batch_size, shuffle=False)
+    total, seg, cls, acc = train_ynet(model, loader, optimizer, loss_fn, device,
+                                      effective_batch_size=effective_batch_size)
+
+    bounds = _step_bounds(n, micro_batch_size, effective_batch_size)
+    assert len(optimizer.steps) == len(bounds)
+    for grads, (start, end) in zip(optimizer.steps, bounds):
+        model.zero_grad()
+        output, label = model(images[start:end])
+        loss_fn(output, label.reshape(-1, 1), masks[start:end], labels[start:end].reshape(-1, 1))[0].backward()
+        for got, expected in zip(grads, [p.grad for p in model.parameters()]):
+            torch.testing.assert_close(got, expected, rtol=1e-5, atol=1e-6)
+
+    with torch.no_grad():
+        output, label = model(images)
+        expected_total, expected_seg, expected_cls = loss_fn(output, label.reshape(-1, 1), masks, labels.reshape(-1, 1))
+    assert total == pytest.approx(expected_total.item(), rel=1e-5)
+    assert seg == pytest.approx(expected_seg.item(), rel=1e-5)
+    assert cls == pytest.approx(expected_cls.item(), rel=1e-5)
+    assert acc == pytest.approx(((label.reshape(-1) > 0).long() == labels).float().mean().item())
@@ -0,0 +1,84 @@
+"""Single-pass threshold sweep over predicted probabilities.
+
+Instead of keeping every probability (or re-running inference) to try other
+thresholds, ProbabilityHistogram bins the probabilities of positive and
+negative targets into ``bins`` equal-width buckets on [0, 1], with one
+bincount per batch. Cumulative sums over the buckets then give the TP / FP /
+FN / TN counts at every threshold ``k / bins`` at once, which is enough for
+the ROC and precision-recall curves, their areas and the F1 (== Dice for
+masks) optimal threshold. Thresholds are exact up to the bin width.
+
+The same class works for the classification head (one probability per
+image) and for mask pixels (H * W probabilities per image).
+"""
+
+import torch
+
+
+class ProbabilityHistogram:
+    def __init__(self, bins=1000):
+        self.bins = bins
+        self.reset()
+
+    def reset(self):
+        """ counts[0]: negatives, counts[1]: positives, per probability bin """
+        self.counts = torch.zeros(2, self.bins, dtype=torch.int64)
+
+    @torch.no_grad()
+    def update(self, probs, targets, target_threshold=0.5):
+        """ probs: probabilities in [0, 1], targets: same number of elements, positive where > target_threshold """
+        probs = probs.reshape(-1).float()
+        positive = (targets.reshape(-1) > target_threshold).long().to(probs.device)
+        idx = (probs.clamp(0, 1) * self.bins).long().clamp_(max=self.bins - 1)
+        code = positive * self.bins + idx
+        self.counts += torch.bincount(code, minlength=2 * self.bins).view(2, self.bins).cpu()
+
+    @property
+    def thresholds(self):
+        """ float64 (bins,), a sample is predicted positive when its probability >= threshold """
+        return torch.arange(self.bins, dtype=torch.float64) / self.bins
+
+    def confusion(self):
+        """ int64 (bins, 4) [TP, FP, FN, TN] at every threshold """
+        neg, pos = self.counts
+        """ Reverse cumsum: number of samples in bins >= k """
+        tp = pos.flip(0).cumsum(0).flip(0)
+        fp = neg.flip(0).cumsum(0).flip(0)
+        fn = pos.sum() - tp
+        tn = neg.sum() - fp
+        return torch.stack([tp, fp, fn, tn], dim=1)
+
+    def curves(self):
+        """ ROC / PR curves, areas and the F1-optimal threshold """
+        tp, fp, fn, tn = self.confusion().double().unbind(1)
+        tpr = tp / (tp + fn).clamp(min=1)
+        fpr = fp / (fp + tn).clamp(min=1)
+        precision = torch.where(tp + fp > 0, tp / (tp + fp).clamp(min=1), torch.ones_like(tp))
+        f1 = 2 * tp / (2 * tp + fp + fn).clamp(min=1)
+
+        """ Thresholds increase along the arrays, so fpr / recall decrease; close both curves at the origin """
+        zero = fpr.new_zeros(1)
+        roc_x = torch.cat([zero, fpr.flip(0)])
+        roc_y = torch.cat([zero, tpr.flip(0)])
+        pr_x = torch.cat([zero, tpr.flip(0)])
+        pr_y = torch.cat([precision.flip(0)[:1], precision.flip(0)])
+
+        best = int(f1.argmax())
+        return {
+            "thresholds": self.thresholds,
+            "fpr": fpr, "tpr": tpr, "precision": precision, "recall": tpr, "f1": f1,
+            "roc_auc": float(torch.trapz(roc_y, roc_x)),
+            "pr_auc": float(torch.trapz(pr_y, pr_x)),
+            "best_threshold": float(self.thresholds[best]),
+            "best_f1": float(f1[best]),
+        }
+
+    def at(self, threshold):
+        """ [TP, FP, FN, TN] at the bin edge closest to threshold """
+        k = min(self.bins - 1, max(0, int(round(threshold * self.bins))))
+        return self.confusion()[k]
+
+
+def format_sweep(curves, name):
+    return (f"{name}: ROC AUC: {curves['roc_auc']:1.4f} - PR AUC: {curves['pr_auc']:1.4f} - "
+            f"best threshold: {curves['best_threshold']:1.3f} (F1/Dice {curves['best_f1']:1.4f})")
@@ -0,0 +1,119 @@
+"""Tiled sliding-window inference for full-resolution images with build_unet.
+
+Instead of resizing the whole dermoscopy image to 256x256, the image is cut
+into overlapping ``tile`` x ``tile`` windows at its native resolution. The
+windows are batched through the model, and the mask logits are blended back
+with a weight window that fades towards the tile borders, so the seams
+between tiles disappear.
+
+Memory stays bounded: tiles are processed one row band at a time, and only
+the float accumulators for the rows still covered by an unfinished band are
+kept. Finished rows go straight into the uint8 output mask. The peak
+float memory is about ``2 * tile * W`` values, independent of the image height.
+
+The classification label is taken from one extra forward pass on the
+downscaled whole image, which is what the classification head was trained on.
+"""
+
+import math
+import numpy as np
+import cv2
+import torch
+
+from inference_engine import to_input_batch
+
+
+def blend_window(tile, overlap):
+    """ (tile, tile) weights: 1 in the centre, linear ramp over the overlap, never 0 """
+    ramp = np.ones(tile, dtype=np.float32)
+    if overlap > 0:
+        edge = (np.arange(overlap, dtype=np.float32) + 1) / (overlap + 1)
+        ramp[:overlap] = edge
+        ramp[-overlap:] = edge[::-1]
+    return np.outer(ramp, ramp)
+
+
+def tile_starts(length, tile, stride):
+    """ Window offsets covering [0, length); the last window is flush with the end """
+    if length <= tile:
+        return [0]
+    n = math.ceil((length - tile) / stride) + 1
+    starts = [min(i * stride, length - tile) for i in range(n)]
+    return sorted(set(starts))
+
+
+def _pad_to_tile(image, tile):
+    """ Reflect-pad images smaller than one tile """
+    H, W = image.shape[:2]
+    pad_h, pad_w = max(0, tile - H), max(0, tile - W)
+    if pad_h or pad_w:
+        image = cv2.copyMakeBorder(image, 0, pad_h, 0, pad_w, cv2.BORDER_REFLECT_101)
+    return image
+
+
+@torch.no_grad()
+def _forward_tiles(model, tiles, device, mean, std, batch_size):
+    """ list of uint8 (tile, tile, 3) -> float32 (N, tile, tile) mask logits """
+    logits = []
+    for i in range(0, len(tiles), batch_size):
+        x = to_input_batch(tiles[i:i + batch_size], device, mean, std)
+        outputs = model(x)
+        mask = outputs[0] if isinstance(outputs, (tuple, list)) else outputs
+        logits.append(mask[:, 0].float().cpu().numpy())
+    return np.concatenate(logits)
+
+
+@torch.no_grad()
+def tiled_predict(model, image, device, tile=256, overlap=64, batch_size=8, mean=None, std=None,
+                  threshold=0.5, classify=True):
+    """ uint8 (H, W, 3) BGR image at any resolution -> (uint8 (H, W) mask, label probability or None) """
+    if not 0 <= overlap < tile:
+        raise ValueError(f"overlap must be in [0, {tile}), got {overlap}")
+    model.eval()
+    H, W = image.shape[:2]
+    padded = _pad_to_tile(image, tile)
+    pH, pW = padded.shape[:2]
+
+    stride = tile - overlap
+    ys = tile_starts(pH, tile, stride)
+    xs = tile_starts(pW, tile, stride)
+    weight = blend_window(tile, overlap)
+    logit_threshold = math.log(threshold / (1.0 - threshold))
+
+    mask = np.zeros((pH, pW), dtype=np.uint8)
+    """ Accumulators cover rows [band_top, band_top + acc.shape[0]) only """
+    band_top = 0
+    acc = np.zeros((0, pW), dtype=np.float32)
+    acc_w = np.zeros((0, pW), dtype=np.float32)
+
+    for k, y0 in enumerate(ys):
+        """ Extend the band down to this row of tiles """
+        needed = y0 + tile - band_top
+        if needed > acc.shape[0]:
+            grow = needed - acc.shape[0]
+            acc = np.vstack([acc, np.zeros((grow, pW), dtype=np.float32)])
+            acc_w = np.vstack([acc_w, np.zeros((grow, pW), dtype=np.float32)])
+
+        tiles = [padded[y0:y0 + tile, x0:x0 + tile] for x0 in xs]
+        logits = _forward_tiles(model, tiles, device, mean, std, batch_size)
+        for x0, l in zip(xs, logits):
+            r = y0 - band_top
+            acc[r:r + tile, x0:x0 + tile] += l * weight
+            acc_w[r:r + tile, x0:x0 + tile] += weight
+
+        """ Rows above the next tile row will not receive more contributions """
+        done_until = ys[k + 1] if k + 1 < len(ys) else band_top + acc.shape[0]
+        n_done = done_until - band_top
+        if n_done > 0:
+            blended = acc[:n_done] / acc_w[:n_done]
+            mask[band_top:done_until] = (blended > logit_threshold).astype(np.uint8)
+            acc, acc_w = acc[n_done:], acc_w[n_done:]
+            band_top = done_until
+
+    label = None
+    if classify:
+        x = to_input_batch([cv2.resize(image, (tile, tile))], device, mean, std)
+        outputs = model(x)
+        if isinstance(outputs, (tuple, list)):
+            label = float(torch.sigmoid(outputs[1].reshape(-1)[0].float()))
+    return mask[:H, :W], label
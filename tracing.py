@@ -0,0 +1,117 @@
+"""Opt-in shape / latency tracing for the model blocks.
+
+Replaces the print statements that used to live in encoder_block.forward and
+build_unet.forward. A ForwardTracer attaches forward pre-hooks and hooks to
+the traced modules only while enabled, so a disabled tracer adds no work to
+the forward pass. Each call is recorded (output shapes, wall time, output
+activation bytes) into a fixed-size ring buffer, which can be turned into a
+per-layer profile table after a run.
+
+    tracer = ForwardTracer(model)
+    with tracer:
+        model(x)
+    print(tracer.table())
+"""
+
+import csv
+import time
+from collections import deque, namedtuple, OrderedDict
+import torch
+
+TraceRecord = namedtuple("TraceRecord", ["name", "shapes", "elapsed_ms", "activation_bytes"])
+
+
+def _tensors(output):
+    if torch.is_tensor(output):
+        return [output]
+    if isinstance(output, (tuple, list)):
+        return [t for o in output for t in _tensors(o)]
+    if isinstance(output, dict):
+        return [t for o in output.values() for t in _tensors(o)]
+    return []
+
+
+class ForwardTracer:
+    def __init__(self, model, capacity=4096, depth=1):
+        """ depth=1 traces the direct children of model (e1..e4, b, d1..d4, ...), depth=2 their children too """
+        self.model = model
+        self.records = deque(maxlen=capacity)
+        self.modules = [(name, m) for name, m in model.named_modules()
+                        if name and name.count(".") < depth]
+        self._handles = []
+        self._start = {}
+
+    @property
+    def enabled(self):
+        return bool(self._handles)
+
+    def enable(self):
+        if self.enabled:
+            return self
+        for name, module in self.modules:
+            self._handles.append(module.register_forward_pre_hook(self._pre_hook(name)))
+            self._handles.append(module.register_forward_hook(self._hook(name)))
+        return self
+
+    def disable(self):
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+        self._start = {}
+        return self
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def _pre_hook(self, name):
+        def hook(module, inputs):
+            self._start[name] = time.perf_counter()
+        return hook
+
+    def _hook(self, name):
+        def hook(module, inputs, output):
+            elapsed_ms = (time.perf_counter() - self._start.pop(name, time.perf_counter())) * 1000.0
+            tensors = _tensors(output)
+            shapes = [tuple(t.shape) for t in tensors]
+            nbytes = sum(t.numel() * t.element_size() for t in tensors)
+            self.records.append(TraceRecord(name, shapes, elapsed_ms, nbytes))
+        return hook
+
+    def clear(self):
+        self.records.clear()
+
+    def profile(self):
+        """ Aggregate the buffered records per layer, in first-call order """
+        layers = OrderedDict()
+        for r in self.records:
+            layer = layers.setdefault(r.name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                               "activation_bytes": 0, "shapes": r.shapes})
+            layer["calls"] += 1
+            layer["total_ms"] += r.elapsed_ms
+            layer["max_ms"] = max(layer["max_ms"], r.elapsed_ms)
+            layer["activation_bytes"] = max(layer["activation_bytes"], r.activation_bytes)
+            layer["shapes"] = r.shapes
+        for layer in layers.values():
+            layer["mean_ms"] = layer["total_ms"] / layer["calls"]
+        return layers
+
+    def table(self):
+        layers = self.profile()
+        total = sum(l["total_ms"] for l in layers.values()) or 1.0
+        lines = [f"{'layer':<12} {'calls':>6} {'mean ms':>9} {'max ms':>9} {'% time':>7} {'act MB':>8}  output shapes"]
+        for name, l in layers.items():
+            shapes = ", ".join(str(list(s)) for s in l["shapes"])
+            lines.append(f"{name:<12} {l['calls']:>6} {l['mean_ms']:>9.3f} {l['max_ms']:>9.3f} "
+                         f"{100.0 * l['total_ms'] / total:>6.1f}% {l['activation_bytes'] / 2**20:>8.2f}  {shapes}")
+        return "\n".join(lines)
+
+    def export_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["layer", "calls", "mean_ms", "max_ms", "total_ms", "activation_bytes", "shapes"])
+            for name, l in self.profile().items():
+                writer.writerow([name, l["calls"], f"{l['mean_ms']:.4f}", f"{l['max_ms']:.4f}",
+                                 f"{l['total_ms']:.4f}", l["activation_bytes"], l["shapes"]])
@@ -0,0 +1,194 @@
+"""Multi-process data-parallel training (DDP over gloo) for the Y-Net loop on one box.
+
+    results = launch(4, model_factory=build_unet, train_dataset=train_dataset,
+                     valid_dataset=valid_dataset, loss_fn=JointLogitsLoss(),
+                     config=DDPConfig(checkpoint_path=...))
+
+Each of the N local processes builds the model, wraps it in
+DistributedDataParallel (gloo backend, gradients all-reduced during
+backward) and reads its own shard of the data through a DistributedSampler.
+Each rank runs ynet.training.train_ynet, so amp, batch augmentation, batch
+preparation and gradient accumulation come from DDPConfig exactly as in the
+single-process loop (effective_batch_size is per rank: one optimizer step
+covers world_size times that many samples). The validation split is dealt out
+round-robin without padding, so every sample counts exactly once, and is
+evaluated on the unwrapped module. Per-epoch losses and accuracy are weighted
+by each rank's sample count and summed with all_reduce; only rank 0 writes
+the checkpoint when the reduced validation loss improves.
+
+Processes are started with the ``fork`` start method, so factories, datasets
+and losses defined in the notebook can be passed directly without being
+importable. Intra-op threads are split evenly between the ranks.
+
+scaling_benchmark runs a fixed number of steps on synthetic tensors for
+1/2/4/8 ranks and reports throughput and scaling efficiency.
+"""
+
+import os
+import time
+import socket
+import itertools
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader, TensorDataset, Subset
+from torch.utils.data.distributed import DistributedSampler
+
+from ynet.training import train_ynet, evaluate_ynet
+
+
+class DDPConfig:
+    def __init__(self, batch_size=5, num_epochs=1, lr=3e-5, momentum=0.9, num_workers=0,
+                 checkpoint_path=None, seed=0, max_steps=None, amp_dtype=None, channels_last=False,
+                 augment=None, prepare=None, effective_batch_size=None):
+        self.batch_size = batch_size          ## per rank
+        self.num_epochs = num_epochs
+        self.lr = lr
+        self.momentum = momentum
+        self.num_workers = num_workers
+        self.checkpoint_path = checkpoint_path
+        self.seed = seed
+        self.max_steps = max_steps            ## per epoch, for benchmarks
+        self.amp_dtype = amp_dtype            ## the rest as in ynet.training.train_ynet
+        self.channels_last = channels_last
+        self.augment = augment
+        self.prepare = prepare
+        self.effective_batch_size = effective_batch_size          ## per rank
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def reduce_sum(values):
+    """ Sum a list of floats over all ranks """
+    t = torch.tensor(values, dtype=torch.float64)
+    dist.all_reduce(t, op=dist.ReduceOp.SUM)
+    return t.tolist()
+
+
+def _num_samples(loader, max_steps):
+    n = len(loader.sampler)
+    return n if max_steps is None else min(n, max_steps * loader.batch_size)
+
+
+def run_epoch(model, loader, loss_fn, config, optimizer=None, max_steps=None):
+    """ One pass over this rank's shard; returns globally reduced (total, seg, class) loss and accuracy
+
+    loss_fn(mask_logits, label_logits, mask_target, label_target) -> (total, seg, class), like JointLogitsLoss.
+    Without an optimizer the unwrapped model.module is evaluated, so no collective runs per batch and
+    ranks may hold different numbers of samples.
+    """
+    device = torch.device("cpu")
+    batches = loader if max_steps is None else itertools.islice(loader, max_steps)
+    n = _num_samples(loader, max_steps)
+    stats = (0.0, 0.0, 0.0, 0.0)
+    if n > 0 and optimizer is not None:
+        stats = train_ynet(model, batches, optimizer, loss_fn, device, config.amp_dtype, config.channels_last,
+                           config.augment, config.prepare, effective_batch_size=config.effective_batch_size)
+    elif n > 0:
+        stats = evaluate_ynet(model.module, batches, loss_fn, device, config.amp_dtype, config.channels_last,
+                              config.prepare)
+
+    """ Per-rank means -> sums over the rank's samples, reduced, then means over all samples """
+    sums = reduce_sum([value * n for value in stats] + [n])
+    n = max(sums[-1], 1)
+    return tuple(value / n for value in sums[:4])
+
+
+def _worker(rank, world_size, port, model_factory, train_dataset, valid_dataset,
+            loss_fn, config, results):
+    os.environ["MASTER_ADDR"] = "127.0.0.1"
+    os.environ["MASTER_PORT"] = str(port)
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // world_size))
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+    try:
+        torch.manual_seed(config.seed)
+        model = model_factory()
+        if config.channels_last:
+            model = model.to(memory_format=torch.channels_last)
+        model = DistributedDataParallel(model)
+        optimizer = torch.optim.SGD(model.parameters(), lr=config.lr, momentum=config.momentum)
+
+        train_sampler = DistributedSampler(train_dataset, world_size, rank, shuffle=True, seed=config.seed)
+        train_loader = DataLoader(train_dataset, batch_size=config.batch_size, sampler=train_sampler,
+                                  num_workers=config.num_workers)
+        valid_loader = None
+        if valid_dataset is not None:
+            """ Round-robin shard without DistributedSampler's padding: no sample is counted twice """
+            valid_shard = Subset(valid_dataset, range(rank, len(valid_dataset), world_size))
+            valid_loader = DataLoader(valid_shard, batch_size=config.batch_size, shuffle=False,
+                                      num_workers=config.num_workers)
+
+        best_valid_loss = float("inf")
+        history = []
+        for epoch in range(config.num_epochs):
+            train_sampler.set_epoch(epoch)
+            dist.barrier()
+            start = time.perf_counter()
+            train_stats = run_epoch(model, train_loader, loss_fn, config, optimizer, config.max_steps)
+            elapsed = time.perf_counter() - start
+            valid_stats = run_epoch(model, valid_loader, loss_fn, config) if valid_loader else None
+
+            steps = len(train_loader) if config.max_steps is None else min(config.max_steps, len(train_loader))
+            epoch_log = {"epoch": epoch + 1, "train": train_stats, "valid": valid_stats, "train_time_s": elapsed,
+                         "samples_per_s": steps * config.batch_size * world_size / elapsed}
+            history.append(epoch_log)
+
+            if rank == 0 and valid_stats is not None and config.checkpoint_path and valid_stats[0] < best_valid_loss:
+                best_valid_loss = valid_stats[0]
+                torch.save(model.module.state_dict(), config.checkpoint_path)
+                epoch_log["checkpoint"] = config.checkpoint_path
+
+        if rank == 0:
+            results.put(history)
+    finally:
+        dist.destroy_process_group()
+
+
+def launch(world_size, model_factory, train_dataset, valid_dataset, loss_fn, config=None,
+           start_method="fork"):
+    """ Train on world_size local processes; returns rank 0's per-epoch history """
+    config = config or DDPConfig()
+    ctx = mp.get_context(start_method)
+    results = ctx.SimpleQueue()
+    mp.start_processes(_worker, nprocs=world_size, join=True, start_method=start_method,
+                       args=(world_size, free_port(), model_factory, train_dataset, valid_dataset,
+                             loss_fn, config, results))
+    return results.get()
+
+
+def synthetic_dataset(num_samples, size=(256, 256), seed=0):
+    """ Pre-decoded (image, mask, label) tensors, so the benchmark measures compute + communication """
+    g = torch.Generator().manual_seed(seed)
+    W, H = size
+    images = torch.randn(num_samples, 3, H, W, generator=g)
+    masks = (torch.rand(num_samples, 1, H, W, generator=g) > 0.5).float()
+    labels = torch.randint(0, 2, (num_samples,), generator=g)
+    return TensorDataset(images, masks, labels)
+
+
+def scaling_benchmark(model_factory, loss_fn, ranks=(1, 2, 4, 8), batch_size=5,
+                      steps=20, size=(256, 256)):
+    """ Training throughput for each world size, plus efficiency relative to one rank """
+    dataset = synthetic_dataset(batch_size * steps * max(ranks), size)
+    results = {}
+    for world_size in ranks:
+        config = DDPConfig(batch_size=batch_size, num_epochs=1, max_steps=steps)
+        history = launch(world_size, model_factory, dataset, None, loss_fn, config)
+        results[world_size] = {"samples_per_s": history[-1]["samples_per_s"], "train_time_s": history[-1]["train_time_s"]}
+    base = results[ranks[0]]["samples_per_s"] / ranks[0]
+    for world_size, r in results.items():
+        r["speedup"] = r["samples_per_s"] / results[ranks[0]]["samples_per_s"]
+        r["efficiency"] = r["samples_per_s"] / (base * world_size)
+    return results
+
+
+def format_scaling(results):
+    lines = [f"{'ranks':>5} {'samples/s':>10} {'speedup':>8} {'efficiency':>10}"]
+    for world_size, r in results.items():
+        lines.append(f"{world_size:>5} {r['samples_per_s']:>10.2f} {r['speedup']:>7.2f}x {100 * r['efficiency']:>9.1f}%")
+    return "\n".join(lines)
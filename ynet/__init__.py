@@ -0,0 +1,39 @@
+"""Importable models, datasets and training loops of the two notebooks.
+
+    from ynet import build_unet, SegmentationDataset, train_ynet
+
+Importing the package itself loads nothing heavy: every name below is looked
+up in its submodule on first access (PEP 562), so ``import ynet`` costs a few
+milliseconds and ``ynet.build_unet`` pays only for torch. Nothing here mounts
+a drive or needs Colab, pandas, sklearn, matplotlib or torchvision; see
+ynet.importtime for the measured budget.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "models": ["conv_block", "encoder_block", "decoder_block", "build_unet", "binary_Classification", "JointLogitsLoss"],
+    "datasets": ["SegmentationDataset", "ClassificationDataset", "load_split"],
+    "training": ["get_accuracy", "train_ynet", "evaluate_ynet", "train_classifier", "evaluate_classifier"],
+    "augment": ["BatchAugment"],
+    "loader": ["LoaderConfig", "BatchPreparer", "make_loader", "tune_num_workers"],
+    "cache": ["TensorCache"],
+    "normalization": ["normalize", "denormalize", "IMAGENET_MEAN", "IMAGENET_STD"],
+    "manifest": ["Manifest"],
+    "utils": ["seeding", "create_dir", "epoch_time"],
+}
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULE_OF)
+
+
+def __getattr__(name):
+    if name in _MODULE_OF:
+        value = getattr(importlib.import_module(f"{__name__}.{_MODULE_OF[name]}"), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,125 @@
+"""Batch-level augmentation for (image, mask) segmentation batches.
+
+    augment = BatchAugment()
+    for image, mask, label in loader:
+        image, mask = augment(image.to(device), mask.to(device))
+
+All geometric transforms (horizontal / vertical flip, rotation, scale and
+translation, i.e. a random crop / zoom) are folded into one 2x3 affine
+matrix per sample. Image and mask are concatenated along the channel axis
+and resampled with a single F.affine_grid / F.grid_sample call, so both get
+exactly the same geometry. The bilinearly resampled mask is snapped back to
+its two values, and pixels moved in from outside the image become
+background. Color jitter (brightness, contrast, saturation) is then applied
+to the image only, per sample but without a Python loop.
+
+Images are expected normalized with ``image_mean`` / ``image_std`` (as
+SegmentationDataset returns them); jitter happens in [0, 1] space. Random
+draws come from ``generator`` if one is given, otherwise from the global
+torch RNG, so ynet.utils.seeding makes a run reproducible.
+"""
+
+import math
+import cv2
+import torch
+import torch.nn.functional as F
+
+from ynet.normalization import normalize, denormalize, IMAGENET_MEAN, IMAGENET_STD
+
+
+def _uniform(n, low, high, generator, device):
+    return torch.rand(n, generator=generator).to(device) * (high - low) + low
+
+
+def _coin(n, p, generator, device):
+    return (torch.rand(n, generator=generator) < p).to(device)
+
+
+class BatchAugment:
+    def __init__(self, hflip=0.5, vflip=0.5, degrees=30.0, scale=(0.9, 1.1), translate=0.1,
+                 brightness=0.2, contrast=0.2, saturation=0.2,
+                 image_mean=IMAGENET_MEAN, image_std=IMAGENET_STD,
+                 mask_values=(-1.0, 1.0), generator=None):
+        self.hflip = hflip
+        self.vflip = vflip
+        self.degrees = degrees
+        self.scale = scale
+        self.translate = translate
+        self.brightness = brightness
+        self.contrast = contrast
+        self.saturation = saturation
+        self.image_mean = image_mean
+        self.image_std = image_std
+        self.mask_values = mask_values          ## (background, foreground) as the dataset normalizes them
+        self.generator = generator
+
+    def theta(self, n, device):
+        """ (n, 2, 3) affine matrices mapping output to input coordinates in [-1, 1] """
+        g = self.generator
+        angle = _uniform(n, -self.degrees, self.degrees, g, device) * (math.pi / 180)
+        scale = _uniform(n, self.scale[0], self.scale[1], g, device)
+        tx = _uniform(n, -self.translate, self.translate, g, device) * 2
+        ty = _uniform(n, -self.translate, self.translate, g, device) * 2
+        fx = 1.0 - 2.0 * _coin(n, self.hflip, g, device).float()
+        fy = 1.0 - 2.0 * _coin(n, self.vflip, g, device).float()
+
+        """ Sampling grid = R(angle) / scale, with the flips applied to the input axes """
+        cos, sin = torch.cos(angle) / scale, torch.sin(angle) / scale
+        theta = torch.stack([
+            torch.stack([cos * fx, -sin * fx, tx], dim=1),
+            torch.stack([sin * fy, cos * fy, ty], dim=1),
+        ], dim=1)
+        return theta
+
+    def geometry(self, image, mask):
+        """ One grid_sample pass over the concatenated image + mask channels """
+        n, c = image.shape[:2]
+        theta = self.theta(n, image.device).to(image.dtype)
+        grid = F.affine_grid(theta, list(image.shape), align_corners=False)
+        background, foreground = self.mask_values
+        """ Shift the mask so that background is 0: zero padding then reads as background """
+        stacked = torch.cat([image, mask - background], dim=1)
+        warped = F.grid_sample(stacked, grid, mode="bilinear", padding_mode="zeros", align_corners=False)
+        image, mask = warped[:, :c], warped[:, c:]
+        mask = background + (foreground - background) * (mask > (foreground - background) / 2).to(image.dtype)
+        return image, mask
+
+    def color(self, image):
+        """ Brightness, contrast and saturation jitter on a normalized (n, 3, H, W) batch """
+        n, device = image.shape[0], image.device
+        x = denormalize(image, self.image_mean, self.image_std)
+        g = self.generator
+
+        b = _uniform(n, 1 - self.brightness, 1 + self.brightness, g, device).view(-1, 1, 1, 1)
+        x = x * b
+        gray = (0.299 * x[:, 2:3] + 0.587 * x[:, 1:2] + 0.114 * x[:, 0:1])     ## BGR channel order (cv2)
+        c = _uniform(n, 1 - self.contrast, 1 + self.contrast, g, device).view(-1, 1, 1, 1)
+        level = gray.mean(dim=(2, 3), keepdim=True)
+        x = (x - level) * c + level
+        gray = (0.299 * x[:, 2:3] + 0.587 * x[:, 1:2] + 0.114 * x[:, 0:1])
+        s = _uniform(n, 1 - self.saturation, 1 + self.saturation, g, device).view(-1, 1, 1, 1)
+        x = (x - gray) * s + gray
+        return normalize(x.clamp_(0, 1), self.image_mean, self.image_std)
+
+    @torch.no_grad()
+    def __call__(self, image, mask):
+        image, mask = self.geometry(image, mask)
+        if self.brightness or self.contrast or self.saturation:
+            image = self.color(image)
+        return image, mask
+
+
+def augment_sample_opencv(image, mask, rng, degrees=30.0, scale=(0.9, 1.1), translate=0.1,
+                          brightness=0.2, hflip=0.5, vflip=0.5):
+    """ Per-sample reference for benchmarks: uint8 (H, W, 3) image and (H, W) mask with cv2 """
+    H, W = mask.shape
+    if rng.random() < hflip:
+        image, mask = cv2.flip(image, 1), cv2.flip(mask, 1)
+    if rng.random() < vflip:
+        image, mask = cv2.flip(image, 0), cv2.flip(mask, 0)
+    M = cv2.getRotationMatrix2D((W / 2, H / 2), rng.uniform(-degrees, degrees), rng.uniform(*scale))
+    M[:, 2] += [rng.uniform(-translate, translate) * W, rng.uniform(-translate, translate) * H]
+    image = cv2.warpAffine(image, M, (W, H), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+    mask = cv2.warpAffine(mask, M, (W, H), flags=cv2.INTER_NEAREST, borderMode=cv2.BORDER_CONSTANT)
+    image = cv2.convertScaleAbs(image, alpha=rng.uniform(1 - brightness, 1 + brightness))
+    return image, mask
@@ -0,0 +1,149 @@
+"""Preprocessed, memory-mapped tensor cache for ynet.datasets.
+
+The first time a dataset is opened with a cache directory every image (and
+mask) is decoded, resized and stored once as fixed-shape uint8 arrays in
+``.npy`` files. Later epochs (and later runs) memory-map those files and hand
+out zero-copy ``torch.from_numpy`` views, so only the cheap uint8 -> float
+normalization is left on the hot path.
+
+Layout of one cache entry (``<cache_dir>/<key>/``):
+    images.npy   uint8  (N, 3, H, W)
+    masks.npy    uint8  (N, ceil(H*W/8))   masks binarized and bit-packed
+    labels.npy   int64  (N,)
+    meta.json    the parameters the key was derived from
+
+The key hashes the source file list (path, size, mtime), the target ``size``
+and the normalization constants, so changing any of them builds a new entry.
+"""
+
+import os
+import json
+import hashlib
+import shutil
+import numpy as np
+import cv2
+import torch
+
+CACHE_VERSION = 1
+
+""" Mask pixels above this value (0..255) are stored as foreground """
+MASK_THRESHOLD = 127
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+def cache_key(images_path, masks_path, labels, size, normalization):
+    """ Hash of everything that changes the cached arrays or how they are served """
+    h = hashlib.sha1()
+    h.update(json.dumps({
+        "version": CACHE_VERSION,
+        "size": list(size),
+        "normalization": normalization,
+        "mask_threshold": MASK_THRESHOLD,
+    }, sort_keys=True).encode())
+    for path in images_path:
+        h.update(json.dumps(file_signature(path)).encode())
+    for path in (masks_path or []):
+        h.update(json.dumps(file_signature(path)).encode())
+    h.update(np.asarray(labels, dtype=np.int64).tobytes())
+    return h.hexdigest()[:16]
+
+
+def _read_image(path, size):
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    image = cv2.resize(image, size, interpolation=cv2.INTER_NEAREST)  ## (H, W, 3)
+    return np.transpose(image, (2, 0, 1))                              ## (3, H, W)
+
+
+def _read_mask(path, size):
+    mask = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    mask = cv2.resize(mask, size, interpolation=cv2.INTER_NEAREST)     ## (H, W)
+    return np.packbits(mask.reshape(-1) > MASK_THRESHOLD)
+
+
+def build_entry(entry_dir, write):
+    """ write(tmp_dir) fills a fresh temporary directory, which then replaces entry_dir """
+    tmp_dir = entry_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    write(tmp_dir)
+
+    """ Rename last so a half-written entry is never picked up """
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+
+
+def load_mapped(path):
+    """ mode='c' (copy-on-write) gives writable arrays, so torch.from_numpy does not warn """
+    return np.load(path, mmap_mode="c")
+
+
+def build_cache(entry_dir, images_path, masks_path, labels, size):
+    """ Decode every sample once and write the arrays under entry_dir """
+    build_entry(entry_dir, lambda tmp_dir: _write_cache(tmp_dir, images_path, masks_path, labels, size))
+
+
+def _write_cache(tmp_dir, images_path, masks_path, labels, size):
+    n = len(images_path)
+    W, H = size
+    images = np.lib.format.open_memmap(os.path.join(tmp_dir, "images.npy"),
+                                       mode="w+", dtype=np.uint8, shape=(n, 3, H, W))
+    for i, path in enumerate(images_path):
+        images[i] = _read_image(path, size)
+    images.flush()
+    del images
+
+    if masks_path is not None:
+        masks = np.lib.format.open_memmap(os.path.join(tmp_dir, "masks.npy"),
+                                          mode="w+", dtype=np.uint8, shape=(n, (H * W + 7) // 8))
+        for i, path in enumerate(masks_path):
+            masks[i] = _read_mask(path, size)
+        masks.flush()
+        del masks
+
+    np.save(os.path.join(tmp_dir, "labels.npy"), np.asarray(labels, dtype=np.int64))
+
+
+class TensorCache:
+    """ Memory-mapped view of one cache entry, built on first use """
+
+    def __init__(self, cache_dir, images_path, masks_path, labels, size, normalization):
+        if masks_path is not None and len(masks_path) != len(images_path):
+            raise ValueError(f"{len(images_path)} images but {len(masks_path)} masks")
+        if len(labels) != len(images_path):
+            raise ValueError(f"{len(images_path)} images but {len(labels)} labels")
+
+        self.size = tuple(size)
+        self.key = cache_key(images_path, masks_path, labels, size, normalization)
+        self.path = os.path.join(cache_dir, self.key)
+
+        if not os.path.exists(os.path.join(self.path, "meta.json")):
+            os.makedirs(cache_dir, exist_ok=True)
+            build_cache(self.path, images_path, masks_path, labels, self.size)
+            with open(os.path.join(self.path, "meta.json"), "w") as f:
+                json.dump({"version": CACHE_VERSION, "n_samples": len(images_path),
+                           "size": list(self.size), "normalization": normalization}, f)
+
+        self.images = load_mapped(os.path.join(self.path, "images.npy"))
+        masks_file = os.path.join(self.path, "masks.npy")
+        self.masks = load_mapped(masks_file) if os.path.exists(masks_file) else None
+        self.labels = np.load(os.path.join(self.path, "labels.npy"))
+
+    def __len__(self):
+        return len(self.images)
+
+    def image(self, index):
+        """ uint8 (3, H, W) tensor sharing memory with the mapped file """
+        return torch.from_numpy(self.images[index])
+
+    def mask(self, index):
+        """ float32 (1, H, W) tensor of 0.0 / 1.0 """
+        W, H = self.size
+        bits = np.unpackbits(self.masks[index], count=H * W)
+        return torch.from_numpy(bits.reshape(1, H, W)).float()
+
+    def label(self, index):
+        return int(self.labels[index])
@@ -0,0 +1,142 @@
+"""Datasets of the two training scripts and the split loader.
+
+SegmentationDataset yields (image, mask, label) for Y-Net, ClassificationDataset
+(image, label) for binary_Classification. Both optionally serve decoded
+samples from a ynet.cache.TensorCache. With ``uint8=True`` they return the
+resized images and masks as raw uint8 tensors instead, and normalization is
+left to ynet.loader.BatchPreparer on the collated batch.
+"""
+
+import os
+import numpy as np
+import cv2
+import torch
+from torch.utils.data import Dataset
+
+from ynet.cache import TensorCache
+from ynet.manifest import Manifest
+from ynet.normalization import normalize, IMAGENET_MEAN, IMAGENET_STD
+
+DATA_DIR = "/content/drive/MyDrive/YNET/SkinCancerData"
+INDEX_DIR = "/content/cache/index"
+
+
+"""SegmentationDataset performs transformations on image, mask using Dataset library """
+class SegmentationDataset(Dataset):
+    image_mean = IMAGENET_MEAN
+    image_std = IMAGENET_STD
+    mask_mean = [0.5]
+    mask_std = [0.5]
+
+    def __init__(self, images_path, masks_path, labels, cache_dir=None, size=(256, 256), uint8=False):
+
+        self.images_path = images_path
+        self.masks_path = masks_path
+        self.labels = labels
+        self.size = size
+        self.uint8 = uint8
+        self.n_samples = len(images_path)
+
+        """ Optional: decode + resize once, then serve every epoch from a memory-mapped cache """
+        self.cache = None
+        if cache_dir is not None:
+            normalization = {"image": [self.image_mean, self.image_std], "mask": [self.mask_mean, self.mask_std]}
+            self.cache = TensorCache(cache_dir, images_path, masks_path, labels, size, normalization)
+
+    def __getitem__(self, index):
+        if self.uint8:
+            return self._get_uint8(index)
+        if self.cache is not None:
+            image = normalize(self.cache.image(index), self.image_mean, self.image_std)
+            mask = normalize(self.cache.mask(index), self.mask_mean, self.mask_std)
+            return image, mask, self.cache.label(index)
+
+        """ Reading image """
+        image = cv2.imread(self.images_path[index], cv2.IMREAD_COLOR)
+        image = image/255.0
+        image = cv2.resize(np.float32(image),self.size,interpolation = cv2.INTER_NEAREST ) ## (512, 512, 3)
+        image = np.transpose(image, (2, 0, 1))  ## (3, 512, 512)
+        image = image.astype(np.float32)
+        image = torch.from_numpy(image)
+        image = normalize(image, self.image_mean, self.image_std)
+
+        """ Reading mask """
+        mask = cv2.imread(self.masks_path[index], cv2.IMREAD_GRAYSCALE)
+        mask = mask/255.0
+        mask = cv2.resize(np.float32(mask),self.size,interpolation = cv2.INTER_NEAREST) ## (512, 512)
+        mask = np.expand_dims(mask, axis=0) ## (1, 512, 512)
+        mask = mask.astype(np.float32)
+        mask = torch.from_numpy(mask)
+        mask = normalize(mask, self.mask_mean, self.mask_std)
+
+        """ Reading classification label """
+        label = self.labels[index]
+
+        return image, mask, label
+
+    def _get_uint8(self, index):
+        """ uint8 (3, H, W) image and (1, H, W) mask in 0..255 """
+        if self.cache is not None:
+            mask = self.cache.mask(index).to(torch.uint8).mul_(255)
+            return self.cache.image(index), mask, self.cache.label(index)
+
+        image = cv2.imread(self.images_path[index], cv2.IMREAD_COLOR)
+        image = cv2.resize(image, self.size, interpolation=cv2.INTER_NEAREST)
+        image = torch.from_numpy(np.ascontiguousarray(np.transpose(image, (2, 0, 1))))
+        mask = cv2.imread(self.masks_path[index], cv2.IMREAD_GRAYSCALE)
+        mask = cv2.resize(mask, self.size, interpolation=cv2.INTER_NEAREST)
+        mask = torch.from_numpy(mask[None])
+        return image, mask, self.labels[index]
+
+    def __len__(self):
+        return self.n_samples
+
+
+"""ClassificationDataset: images in [0, 1] without per-channel normalization, and their labels """
+class ClassificationDataset(Dataset):
+    def __init__(self, images_path, labels, cache_dir=None, size=(256, 256), uint8=False):
+
+        self.images_path = images_path
+        self.labels = labels
+        self.size = size
+        self.uint8 = uint8
+        self.n_samples = len(images_path)
+
+        """ Optional: decode + resize once, then serve every epoch from a memory-mapped cache """
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = TensorCache(cache_dir, images_path, None, labels, size, {"image": None})
+
+    def __getitem__(self, index):
+        if self.cache is not None:
+            image = self.cache.image(index)
+            return (image if self.uint8 else normalize(image)), self.cache.label(index)
+
+        if self.uint8:
+            image = cv2.imread(self.images_path[index], cv2.IMREAD_COLOR)
+            image = cv2.resize(image, self.size, interpolation=cv2.INTER_NEAREST)
+            return torch.from_numpy(np.ascontiguousarray(np.transpose(image, (2, 0, 1)))), self.labels[index]
+
+        """ Reading image """
+        image = cv2.imread(self.images_path[index], cv2.IMREAD_COLOR)
+        image = image/255.0
+        image = cv2.resize(np.float32(image),self.size,interpolation = cv2.INTER_NEAREST ) ## (256, 256, 3)
+        image = np.transpose(image, (2, 0, 1))  ## (3, 256, 256)
+        image = image.astype(np.float32)
+        image = torch.from_numpy(image)
+
+        """ Reading classification Label """
+        label = self.labels[index]
+
+        return image, label
+
+    def __len__(self):
+        return self.n_samples
+
+
+def load_split(images, labels_csv, masks=None, data_dir=DATA_DIR, index_dir=INDEX_DIR):
+    """ (image paths, mask paths or None, labels) for one split, aligned by sample id """
+    index_name = "-".join(os.path.splitext(part)[0] for part in [images, labels_csv, masks] if part)
+    manifest = Manifest.load_or_build(f"{index_dir}/{index_name}.npz", f"{data_dir}/{images}",
+                                      f"{data_dir}/{labels_csv}", f"{data_dir}/{masks}" if masks else None)
+    return manifest.images, manifest.masks, manifest.labels
@@ -0,0 +1,90 @@
+"""Import-time budget of the ynet package.
+
+    python -m ynet.importtime            # table, exit status 1 when over budget
+
+Each module is imported in a fresh interpreter. Its unavoidable dependencies
+(``BASE_DEPS``: numpy, torch, cv2) are imported first and timed separately,
+so the budget only covers what the package itself adds on top of them:
+
+    ynet             50 ms   (no third-party imports at all)
+    ynet.models     100 ms   on top of torch
+    ynet.datasets   150 ms   on top of numpy, cv2, torch
+    ynet.training   100 ms   on top of torch
+    ynet.augment    100 ms   on top of cv2, torch
+    ynet.loader     100 ms   on top of torch
+    ynet.cache      100 ms   on top of numpy, cv2, torch
+    ynet.manifest    50 ms   on top of numpy
+    ynet.normalization 50 ms on top of torch
+
+None of them may load a module listed in ``FORBIDDEN`` (notebook-only or
+plotting / reporting dependencies).
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+IMPORT_BUDGET_MS = {"ynet": 50, "ynet.models": 100, "ynet.datasets": 150, "ynet.training": 100, "ynet.augment": 100,
+                    "ynet.loader": 100, "ynet.cache": 100, "ynet.manifest": 50,
+                    "ynet.normalization": 50}
+
+BASE_DEPS = {"ynet": [], "ynet.models": ["torch"], "ynet.datasets": ["numpy", "cv2", "torch"],
+             "ynet.training": ["torch"], "ynet.augment": ["cv2", "torch"], "ynet.loader": ["torch"],
+             "ynet.cache": ["numpy", "cv2", "torch"], "ynet.manifest": ["numpy"],
+             "ynet.normalization": ["torch"]}
+
+FORBIDDEN = ["google.colab", "pandas", "matplotlib", "sklearn", "torchvision", "torchsummary", "imageio", "tqdm"]
+
+_CHILD = """
+import sys, time, json, importlib
+t0 = time.perf_counter()
+for dep in {deps!r}:
+    importlib.import_module(dep)
+t1 = time.perf_counter()
+importlib.import_module({module!r})
+t2 = time.perf_counter()
+loaded = [m for m in {forbidden!r} if m in sys.modules]
+print(json.dumps({{"deps_ms": 1000 * (t1 - t0), "import_ms": 1000 * (t2 - t1), "forbidden": loaded}}))
+"""
+
+
+def measure(module, repeats=3):
+    """ Best of ``repeats`` fresh-interpreter imports: {"deps_ms", "import_ms", "forbidden"} """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = _CHILD.format(deps=BASE_DEPS.get(module, []), module=module, forbidden=FORBIDDEN)
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.check_output([sys.executable, "-c", code], cwd=root)
+        runs.append(json.loads(out.decode().strip().splitlines()[-1]))
+    return min(runs, key=lambda r: r["import_ms"])
+
+
+def check(budget=None, repeats=3):
+    """ {module: measurement + "budget_ms" + "ok"} for every module in the budget """
+    budget = budget or IMPORT_BUDGET_MS
+    results = {}
+    for module, limit in budget.items():
+        r = measure(module, repeats)
+        r["budget_ms"] = limit
+        r["ok"] = r["import_ms"] <= limit and not r["forbidden"]
+        results[module] = r
+    return results
+
+
+def format_check(results):
+    lines = [f"{'module':<15} {'deps ms':>8} {'import ms':>10} {'budget':>7}  status"]
+    for module, r in results.items():
+        status = "ok" if r["ok"] else "OVER" if not r["forbidden"] else "loads " + ", ".join(r["forbidden"])
+        lines.append(f"{module:<15} {r['deps_ms']:>8.1f} {r['import_ms']:>10.1f} {r['budget_ms']:>7}  {status}")
+    return "\n".join(lines)
+
+
+def main():
+    results = check()
+    print(format_check(results))
+    sys.exit(0 if all(r["ok"] for r in results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""DataLoader configuration for the training loops: uint8 batches, normalized on the device.
+
+    config = LoaderConfig(batch_size=5, num_workers="auto")
+    train_loader = make_loader(SegmentationDataset(..., uint8=True), config, shuffle=True)
+    prepare = BatchPreparer(device, image_mean=..., image_std=..., mask_mean=..., mask_std=...)
+    train_ynet(model, train_loader, optimizer, loss_fn, device, prepare=prepare)
+
+Datasets built with ``uint8=True`` return raw uint8 images and masks, so
+workers hand the main process a quarter of the bytes a float32 batch would
+take. BatchPreparer copies the collated batch to the device (non_blocking
+from pinned memory when the loader pins it) and only then converts to float
+and normalizes, once per batch instead of once per sample.
+
+Workers are persistent across epochs and prefetch ``prefetch_factor``
+batches each; memory is pinned automatically when training on CUDA.
+``num_workers="auto"`` measures loader throughput for a few worker counts
+on the dataset and keeps the fastest (tune_num_workers).
+
+Persistent workers keep their own copy of the dataset: datasets whose state
+changes between epochs in the main process (ShardDataset.set_epoch) need
+``persistent_workers=False``.
+"""
+
+import os
+import time
+import torch
+from torch.utils.data import DataLoader
+
+from ynet.normalization import normalize
+
+
+class LoaderConfig:
+    def __init__(self, batch_size=5, num_workers=2, persistent_workers=True, prefetch_factor=2,
+                 pin_memory=None, drop_last=False):
+        self.batch_size = batch_size
+        self.num_workers = num_workers          ## int or "auto"
+        self.persistent_workers = persistent_workers
+        self.prefetch_factor = prefetch_factor
+        self.pin_memory = torch.cuda.is_available() if pin_memory is None else pin_memory
+        self.drop_last = drop_last
+
+
+def _loader(dataset, config, num_workers, shuffle):
+    kwargs = {}
+    if num_workers > 0:
+        kwargs = {"persistent_workers": config.persistent_workers, "prefetch_factor": config.prefetch_factor}
+    return DataLoader(dataset, batch_size=config.batch_size, shuffle=shuffle, num_workers=num_workers,
+                      pin_memory=config.pin_memory, drop_last=config.drop_last, **kwargs)
+
+
+def loader_throughput(dataset, config, num_workers, num_batches=10):
+    """ Samples/s over num_batches batches, after the first batch (worker start-up) """
+    loader = _loader(dataset, config, num_workers, shuffle=False)
+    it = iter(loader)
+    next(it)
+    n_samples, start = 0, time.perf_counter()
+    for i, batch in enumerate(it):
+        n_samples += len(batch[0])
+        if i + 1 >= num_batches:
+            break
+    elapsed = time.perf_counter() - start
+    del it, loader
+    return n_samples / elapsed if elapsed > 0 else 0.0
+
+
+def tune_num_workers(dataset, config, candidates=None, num_batches=10):
+    """ (best num_workers, {num_workers: samples/s}); stops once adding workers no longer helps by 5% """
+    candidates = candidates or [w for w in (0, 1, 2, 4, 8, 16) if w <= (os.cpu_count() or 1)]
+    results = {}
+    best = candidates[0]
+    for workers in candidates:
+        results[workers] = loader_throughput(dataset, config, workers, num_batches)
+        if results[workers] > results[best] * 1.05:
+            best = workers
+        elif workers > best:
+            break
+    return best, results
+
+
+def make_loader(dataset, config, shuffle=True):
+    """ DataLoader for config; resolves num_workers="auto" once and stores the result in config """
+    if config.num_workers == "auto":
+        config.num_workers, _ = tune_num_workers(dataset, config)
+    return _loader(dataset, config, config.num_workers, shuffle)
+
+
+class BatchPreparer:
+    """ Collated batch -> float32 tensors on device, normalized after the transfer
+
+    uint8 images are scaled to [0, 1] and normalized with image_mean / image_std, uint8 masks
+    (0..255) likewise with mask_mean / mask_std; float tensors are only moved. Labels are moved as is.
+    """
+
+    def __init__(self, device, image_mean=None, image_std=None, mask_mean=None, mask_std=None, non_blocking=True):
+        self.device = device
+        self.non_blocking = non_blocking
+        self.image_norm = self._stats(image_mean, image_std)
+        self.mask_norm = self._stats(mask_mean, mask_std)
+
+    def _stats(self, mean, std):
+        """ (mean, std) as float32 tensors on device, created once instead of per batch """
+        if mean is None:
+            return None, None
+        return (torch.tensor(mean, dtype=torch.float32, device=self.device),
+                torch.tensor(std, dtype=torch.float32, device=self.device))
+
+    def _tensor(self, x, norm):
+        x = x.to(self.device, non_blocking=self.non_blocking)
+        if x.dtype == torch.uint8:
+            return normalize(x, *norm)
+        return x.float()
+
+    def __call__(self, batch):
+        image = self._tensor(batch[0], self.image_norm)
+        label = batch[-1].to(self.device, non_blocking=self.non_blocking)
+        if len(batch) == 2:
+            return image, label
+        return image, self._tensor(batch[1], self.mask_norm), label
@@ -0,0 +1,111 @@
+"""Filename-keyed sample index: CSV labels joined to image and mask files by sample id.
+
+DriveDataset used to pair ``sorted(glob(images))[i]`` with ``sorted(glob(masks))[i]``
+and ``df['NV'][i]``, which is only right as long as all three orderings agree.
+A Manifest joins them by ISIC sample id instead, checks that every CSV row has
+its image (and mask) and that no id is listed twice, and stores the result in
+a compact ``.npz`` index:
+
+    manifest = Manifest.load_or_build("/content/cache/train_index.npz", images_dir, csv_path, masks_dir)
+    dataset = DriveDataset(manifest.images, manifest.masks, manifest.labels)
+
+The index is rebuilt only when the CSV or one of the directories changed
+(their size / mtime are stored in the index), so a normal start-up is a
+single file load with no directory listing and no pandas parsing.
+"""
+
+import os
+import json
+from glob import glob
+import numpy as np
+
+MASK_SUFFIX = "_segmentation"
+INDEX_VERSION = 1
+
+
+def sample_id(path):
+    """ ISIC_0024306.jpg -> ISIC_0024306 ; ISIC_0024306_segmentation.png -> ISIC_0024306 """
+    stem = os.path.basename(path).split(".")[0]
+    return stem[:-len(MASK_SUFFIX)] if stem.endswith(MASK_SUFFIX) else stem
+
+
+def _signature(images_dir, csv_path, masks_dir):
+    """ Cheap staleness check: stat of the CSV and of the directories (mtime changes on add/remove) """
+    sig = {"version": INDEX_VERSION}
+    for key, path in [("images", images_dir), ("csv", csv_path), ("masks", masks_dir)]:
+        if path is not None:
+            st = os.stat(path)
+            sig[key] = [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+    return json.dumps(sig, sort_keys=True)
+
+
+def _index_by_id(paths, kind):
+    index = {}
+    for p in paths:
+        sid = sample_id(p)
+        if sid in index:
+            raise ValueError(f"Two {kind} files for sample {sid}: {index[sid]} and {p}")
+        index[sid] = p
+    return index
+
+
+class Manifest:
+    def __init__(self, ids, images, masks, labels, signature=""):
+        self.ids = list(ids)
+        self.images = list(images)
+        self.masks = list(masks) if masks is not None else None
+        self.labels = [int(l) for l in labels]
+        self.signature = signature
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, images_dir, csv_path, masks_dir=None, id_column="image", label_column="NV"):
+        """ Join csv_path rows to files by sample id, in CSV order; raises on any missing part """
+        import pandas as pd     ## only needed to build, loading a saved index does not pay for it
+        df = pd.read_csv(csv_path, usecols=[id_column, label_column])
+        ids = df[id_column].astype(str).tolist()
+        duplicated = df[id_column][df[id_column].duplicated()].tolist()
+        if duplicated:
+            raise ValueError(f"{csv_path} lists {len(duplicated)} ids more than once, e.g. {duplicated[:5]}")
+
+        images = _index_by_id(glob(os.path.join(images_dir, "*")), "image")
+        masks = _index_by_id(glob(os.path.join(masks_dir, "*")), "mask") if masks_dir else None
+
+        missing = [sid for sid in ids if sid not in images or (masks is not None and sid not in masks)]
+        if missing:
+            raise ValueError(f"{len(missing)} samples in {csv_path} have no image/mask, e.g. {missing[:5]}")
+
+        return cls(ids, [images[sid] for sid in ids],
+                   [masks[sid] for sid in ids] if masks is not None else None,
+                   df[label_column].astype(int).tolist(),
+                   _signature(images_dir, csv_path, masks_dir))
+
+    def save(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {"ids": np.array(self.ids), "images": np.array(self.images),
+                  "labels": np.array(self.labels, dtype=np.int64), "signature": np.array(self.signature)}
+        if self.masks is not None:
+            arrays["masks"] = np.array(self.masks)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            masks = data["masks"].tolist() if "masks" in data.files else None
+            return cls(data["ids"].tolist(), data["images"].tolist(), masks,
+                       data["labels"].tolist(), str(data["signature"]))
+
+    @classmethod
+    def load_or_build(cls, index_path, images_dir, csv_path, masks_dir=None, id_column="image", label_column="NV"):
+        if os.path.exists(index_path):
+            manifest = cls.load(index_path)
+            if manifest.signature == _signature(images_dir, csv_path, masks_dir):
+                return manifest
+        manifest = cls.build(images_dir, csv_path, masks_dir, id_column, label_column)
+        manifest.save(index_path)
+        return manifest
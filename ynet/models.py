@@ -0,0 +1,235 @@
+"""Y-Net (build_unet) and the stand-alone binary_Classification network, plus the joint loss.
+
+Both models return logits; apply torch.sigmoid only for thresholding.
+"""
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torch.utils.checkpoint
+
+"""Joint loss on the raw logits of both heads: BCEWithLogits for segmentation and
+classification, plus an optional soft-Dice term. No separate sigmoid pass is needed
+and the log-sum-exp form stays stable under bfloat16 autocast."""
+class JointLogitsLoss(nn.Module):
+    def __init__(self, seg_weight=1.0, class_weight=1.0, dice_weight=0.0, smooth=1.0):
+        super().__init__()
+        self.seg_weight = seg_weight
+        self.class_weight = class_weight
+        self.dice_weight = dice_weight
+        self.smooth = smooth
+
+    def forward(self, mask_logits, label_logits, mask_target, label_target):
+        """ Returns (total, segmentation, classification) losses, each a batch mean """
+        mask_logits, label_logits = mask_logits.float(), label_logits.float()
+        """ Targets come normalized to -1 / 1 (or as 0 / 1): binarize, BCE is unbounded below for a -1 target """
+        truth = (mask_target > 0).float()
+        seg = F.binary_cross_entropy_with_logits(mask_logits, truth)
+        if self.dice_weight > 0:
+            """ Soft Dice against the binarized mask """
+            probs = torch.sigmoid(mask_logits).flatten(1)
+            truth = truth.flatten(1)
+            inter = (probs * truth).sum(1)
+            dice = (2 * inter + self.smooth) / (probs.sum(1) + truth.sum(1) + self.smooth)
+            seg = seg + self.dice_weight * (1 - dice.mean())
+
+        cls = F.binary_cross_entropy_with_logits(label_logits.reshape(-1), label_target.reshape(-1).float())
+        total = self.seg_weight * seg + self.class_weight * cls
+        return total, seg, cls
+
+"""CNN building blocks for feature learning"""
+class conv_block(nn.Module):
+    def __init__(self, in_c, out_c):
+        super().__init__()
+
+        self.conv1 = nn.Conv2d(in_c, out_c, kernel_size = 3, padding = 1)
+        self.bn1 = nn.BatchNorm2d(out_c)
+
+        self.conv2 = nn.Conv2d(out_c, out_c, kernel_size = 3, padding = 1)
+        self.bn2 = nn.BatchNorm2d(out_c)
+
+        self.relu = nn.ReLU()
+
+        """ Recompute this block in backward instead of keeping its activations (training only) """
+        self.checkpoint = False
+
+    def forward(self, inputs):
+        if self.checkpoint and self.training and torch.is_grad_enabled():
+            return torch.utils.checkpoint.checkpoint(self._checkpointed(), inputs, use_reentrant=False)
+        return self._forward(inputs)
+
+    def _checkpointed(self):
+        """ _forward for checkpoint(): the first call is the forward pass, later ones are recomputes in
+        backward, which must not update the BatchNorm running statistics a second time """
+        calls = []
+
+        def run(inputs):
+            if not calls:
+                calls.append(1)
+                return self._forward(inputs)
+            stats = [(bn, bn.running_mean.clone(), bn.running_var.clone(), bn.num_batches_tracked.clone())
+                     for bn in (self.bn1, self.bn2)]
+            try:
+                return self._forward(inputs)
+            finally:
+                for bn, mean, var, tracked in stats:
+                    bn.running_mean.copy_(mean)
+                    bn.running_var.copy_(var)
+                    bn.num_batches_tracked.copy_(tracked)
+        return run
+
+    def _forward(self, inputs):
+        x = self.conv1(inputs)
+        x = self.bn1(x)
+        x = self.relu(x)
+
+        x = self.conv2(x)
+        x = self.bn2(x)
+        x = self.relu(x)
+
+        return x
+
+class encoder_block(nn.Module):
+    def __init__(self, in_c, out_c):
+        super().__init__()
+
+        self.conv = conv_block(in_c, out_c)
+        self.pool = nn.MaxPool2d((2, 2))
+
+    def forward(self, inputs):
+        x = self.conv(inputs)
+        p = self.pool(x)
+
+        return x, p
+
+class decoder_block(nn.Module):
+    def __init__(self, in_c, out_c):
+        super().__init__()
+
+        self.up = nn.ConvTranspose2d(in_c, out_c, kernel_size=2, stride=2, padding=0)
+        self.conv = conv_block(out_c+out_c, out_c)
+
+    def forward(self, inputs, skip):
+        x = self.up(inputs)
+        x = torch.cat([x, skip], axis=1)
+        x = self.conv(x)
+        return x
+
+"""Model declaration and definition"""
+class build_unet(nn.Module):
+    def __init__(self, checkpoint=False):
+        super().__init__()
+
+        """ Encoder """
+        self.e1 = encoder_block(3, 32)
+        self.e2 = encoder_block(32, 32) 
+        self.e3 = encoder_block(32, 32)
+        self.e4 = encoder_block(32, 32)
+
+        """ Bottleneck """
+        self.b = conv_block(32, 64)
+
+        """ Decoder """
+        self.d1 = decoder_block(64, 32)
+        self.d2 = decoder_block(32, 32)
+        self.d3 = decoder_block(32, 32)
+        self.d4 = decoder_block(32, 32)
+
+        """ Segmentation Classifier """
+        self.outputs = nn.Conv2d(32, 1, kernel_size=1, padding=0)
+
+        """ Classification classifier """
+        self.e5 = encoder_block(64,64)
+        # self.e6 = encoder_block(64,64)
+        self.global_avg = nn.AdaptiveAvgPool2d(1)
+        self.fc1 = nn.Linear(64, 64)
+        self.fc2 = nn.Linear(64, 32)   
+        self.fc3 = nn.Linear(32, 1)       ### ---> 2nd dimension is the number of classification labels
+
+        self.set_checkpointing(checkpoint)
+
+    def set_checkpointing(self, enabled=True):
+        """ Activation checkpointing per encoder / decoder / bottleneck conv_block: only the block
+        inputs are kept for backward and the convolutions are recomputed, trading compute for memory.
+        The recompute does not touch the BatchNorm running statistics, so training with and without
+        checkpointing ends with the same eval statistics. """
+        for module in self.modules():
+            if isinstance(module, conv_block):
+                module.checkpoint = enabled
+        return self
+
+    def encode(self, inputs):
+        """ Encoder + bottleneck: returns b and the skip connections (s1, s2, s3, s4) """
+        s1, p1 = self.e1(inputs)
+        s2, p2 = self.e2(p1)
+        s3, p3 = self.e3(p2)
+        s4, p4 = self.e4(p3)
+
+        """ Bottleneck """
+        b = self.b(p4)
+        return b, (s1, s2, s3, s4)
+
+    def classify(self, b):
+        """ Diagnostic branch on the bottleneck features, returns label logits """
+        s5, p5 = self.e5(b)
+        # s6, p6 = self.e6(p5)
+        avg = self.global_avg(p5)
+        avg = avg.view(avg.size(0), -1)
+
+        fc1 = self.fc1(avg)
+        fc2 = self.fc2(fc1)
+        fc3 = self.fc3(fc2)
+        return fc3
+
+    def forward(self, inputs):
+        """ Encoder """
+        b, (s1, s2, s3, s4) = self.encode(inputs)
+
+        """ Decoder """
+        d1 = self.d1(b, s4)
+        d2 = self.d2(d1, s3)
+        d3 = self.d3(d2, s2)
+        d4 = self.d4(d3, s1)
+
+        outputs = self.outputs(d4)
+
+        """ Diagnostic branch """
+        fc3 = self.classify(b)
+
+        """ Both heads return logits; losses work on logits, sigmoid is applied only for thresholding """
+        label = fc3
+        # print("Final output shpes: output & label: ",outputs.shape, label.shape)
+
+        return outputs, label
+
+"""Stand-alone classifier: one encoder block and the fully connected head"""
+class binary_Classification(nn.Module):
+    def __init__(self):
+        super().__init__()
+
+        """ Classification classifier """
+        self.e1 = encoder_block(3,64)
+        # self.e2 = encoder_block(64, 128)
+        # self.b = conv_block(64, 128)
+        # self.e5 = encoder_block(128,256)
+        self.global_avg = nn.AdaptiveAvgPool2d(1)
+        self.fc1 = nn.Linear(64, 64)
+        self.fc2 = nn.Linear(64, 32)   
+        self.fc3 = nn.Linear(32, 1)       ### ---> 2nd dimension is the number of classification labels
+
+    def forward(self, inputs):
+
+        """ Diagnostic branch """
+        _, p1 = self.e1(inputs)
+        # p2 = self.e2(p1)
+        # b = self.b(p2)
+        # p5 = self.e5(p2)
+        avg = self.global_avg(p1)
+        avg = avg.view(avg.size(0), -1)
+        fc1 = self.fc1(avg)
+        fc2 = self.fc2(fc1)
+        fc3 = self.fc3(fc2)
+        """ Returns the logit; BCEWithLogitsLoss in training, sigmoid only for thresholding """
+        label = fc3
+
+        return label
@@ -0,0 +1,32 @@
+"""Input normalization shared by the datasets, loaders, augmentation and inference.
+
+    x = normalize(uint8_batch, IMAGENET_MEAN, IMAGENET_STD)   # uint8 -> [0, 1] -> (x - mean) / std
+    x = denormalize(x, IMAGENET_MEAN, IMAGENET_STD)           # back to [0, 1]
+
+Works on (C, H, W) images and (B, C, H, W) batches alike, on any device.
+"""
+
+import torch
+
+""" ImageNet statistics the Y-Net inputs are normalized with (applied to cv2's BGR images, as in training) """
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+
+def _channels(values, x):
+    return torch.as_tensor(values, dtype=x.dtype, device=x.device).view(-1, 1, 1)
+
+
+def normalize(x, mean=None, std=None):
+    """ uint8 tensors are scaled to float32 [0, 1] first; then per-channel (x - mean) / std if mean is given.
+    Float inputs are normalized in place. """
+    if x.dtype == torch.uint8:
+        x = x.float().div_(255.0)
+    if mean is not None:
+        x = x.sub_(_channels(mean, x)).div_(_channels(std, x))
+    return x
+
+
+def denormalize(x, mean, std):
+    """ Inverse of normalize for float tensors: x * std + mean, as a new tensor """
+    return x * _channels(std, x) + _channels(mean, x)
@@ -0,0 +1,186 @@
+"""One-epoch train / evaluate loops for Y-Net and binary_Classification.
+
+amp_dtype=torch.bfloat16 runs the forward under autocast and channels_last
+feeds the inputs in NHWC; the losses are always computed in fp32 on logits.
+prepare(batch) -> tensors on device, e.g. ynet.loader.BatchPreparer for uint8
+batches, replaces the default float32 ``.to(device)`` of each batch.
+"""
+
+import torch
+
+
+"""Accuracy metric definition (y_prob: probabilities, apply sigmoid to logits first)"""
+def get_accuracy(y_true, y_prob):
+  y_true = y_true.detach().reshape(-1).float()
+  y_pred = (y_prob.detach().reshape(-1) > 0.5).float()
+  return (y_pred == y_true).float().mean().item()
+
+
+def _apply_step(optimizer, n_samples, effective_batch_size):
+    """ optimizer.step() on gradients accumulated over n_samples, rescaled to a per-sample mean """
+    if n_samples != effective_batch_size:
+        for group in optimizer.param_groups:
+            for p in group["params"]:
+                if p.grad is not None:
+                    p.grad.mul_(effective_batch_size / n_samples)
+    optimizer.step()
+    optimizer.zero_grad()
+
+
+def train_ynet(model, loader, optimizer, loss_fn, device, amp_dtype=None, channels_last=False, augment=None,
+               prepare=None, effective_batch_size=None):
+    """ Returns (total, segmentation, classification) mean losses and accuracy over the epoch's samples
+
+    augment(image, mask) -> (image, mask), e.g. ynet.augment.BatchAugment, runs on the batch on device.
+
+    effective_batch_size: samples per optimizer step. Gradients of consecutive loader batches
+    (micro-batches of any size) are accumulated until at least that many samples were seen; None
+    steps after every batch. Each micro-batch loss is a batch mean, so it is weighted by its number
+    of samples: the gradient of every step, including a short one at the end of the epoch or after
+    a ragged last batch, is the mean over exactly the samples it covers. BatchNorm statistics still
+    come from the micro-batches.
+    """
+    seg_loss = 0.0
+    class_loss = 0.0
+    total_loss = 0.0
+    correct = 0.0
+    n_seen = 0
+    n_pending = 0
+
+    model.train()
+    optimizer.zero_grad()
+    for i,(input, target, target2) in enumerate(loader):
+      if prepare is not None:
+        input, target, target2 = prepare((input, target, target2))
+      else:
+        input = input.to(device, dtype=torch.float32)
+        target = target.to(device, dtype=torch.float32)
+        target2 = target2.to(device)
+      if augment is not None:
+        input, target = augment(input, target)
+      if channels_last:
+        input = input.contiguous(memory_format=torch.channels_last)
+      n = input.shape[0]
+      step_size = effective_batch_size or n
+
+      # run the model : output -> predicted mask, label -> predicted label for classification
+      with torch.autocast(device_type=device.type, dtype=amp_dtype or torch.bfloat16, enabled=amp_dtype is not None):
+        output, label = model(input)
+      output, label = output.float(), label.float()
+
+      # compute the loss: output and label are logits
+      label = label.reshape(-1, 1)
+      target2 = target2.reshape(-1, 1)
+
+      loss, loss1, loss2 = loss_fn(output, label, target, target2)
+      (loss * (n / step_size)).backward()
+      n_pending += n
+      if n_pending >= step_size:
+        _apply_step(optimizer, n_pending, step_size)
+        n_pending = 0
+
+      seg_loss += loss1.item() * n
+      class_loss += loss2.item() * n
+      total_loss += loss.item() * n
+      correct += get_accuracy(target2, torch.sigmoid(label)) * n
+      n_seen += n
+
+    if n_pending:
+      _apply_step(optimizer, n_pending, effective_batch_size)
+
+    return total_loss / n_seen, seg_loss / n_seen, class_loss / n_seen, correct / n_seen
+
+
+def evaluate_ynet(model, loader, loss_fn, device, amp_dtype=None, channels_last=False, prepare=None):
+    """ Same per-sample weighting as train_ynet, so a ragged last batch does not skew the means """
+    epoch_loss_seg = 0.0
+    epoch_loss_class = 0.0
+    epoch_total_loss = 0.0
+    correct = 0.0
+    n_seen = 0
+
+    model.eval()
+    with torch.no_grad():
+        for i,(input, target, target2) in enumerate(loader):
+          if prepare is not None:
+            input, target, target2 = prepare((input, target, target2))
+          else:
+            input = input.to(device, dtype=torch.float32)
+            target = target.to(device, dtype=torch.float32)
+            target2 = target2.to(device)
+          if channels_last:
+            input = input.contiguous(memory_format=torch.channels_last)
+
+          with torch.autocast(device_type=device.type, dtype=amp_dtype or torch.bfloat16, enabled=amp_dtype is not None):
+            output, label = model(input)
+          output, label = output.float(), label.float()
+          label = label.reshape(-1, 1)
+          target2 = target2.reshape(-1, 1)
+
+          loss, loss1, loss2 = loss_fn(output, label, target, target2)
+          n = input.shape[0]
+
+          epoch_total_loss += loss.item() * n
+          epoch_loss_seg += loss1.item() * n
+          epoch_loss_class += loss2.item() * n
+          correct += get_accuracy(target2, torch.sigmoid(label)) * n
+          n_seen += n
+
+        epoch_total_loss1 = epoch_total_loss/n_seen
+        epoch_loss_seg1 = epoch_loss_seg/n_seen
+        epoch_loss_class1 = epoch_loss_class/n_seen
+        validAcc = correct/n_seen
+
+    return epoch_total_loss1, epoch_loss_seg1, epoch_loss_class1 , validAcc
+
+
+def train_classifier(model, loader, optimizer, loss_fn, device, amp_dtype=None, channels_last=False, prepare=None):
+    """ Returns the mean training loss of binary_Classification """
+    epoch_loss = 0.0
+
+    model.train()
+    for x, y in loader:
+        if prepare is not None:
+            x, y = prepare((x, y))
+        else:
+            x = x.to(device, dtype=torch.float32)
+        y = y.to(device, dtype=torch.float32)
+        if channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+
+        optimizer.zero_grad()
+        with torch.autocast(device_type=device.type, dtype=amp_dtype or torch.bfloat16, enabled=amp_dtype is not None):
+            y_pred = model(x)
+        y_pred = y_pred.float().view(-1)
+        loss = loss_fn(y_pred, y)
+        loss.backward()
+        optimizer.step()
+        epoch_loss += loss.item()
+
+    epoch_loss = epoch_loss/len(loader)
+    return epoch_loss
+
+
+def evaluate_classifier(model, loader, loss_fn, device, amp_dtype=None, channels_last=False, prepare=None):
+    epoch_loss = 0.0
+
+    model.eval()
+    with torch.no_grad():
+        for x, y in loader:
+            if prepare is not None:
+                x, y = prepare((x, y))
+            else:
+                x = x.to(device, dtype=torch.float32)
+            y = y.to(device, dtype=torch.float32)
+            if channels_last:
+                x = x.contiguous(memory_format=torch.channels_last)
+
+            with torch.autocast(device_type=device.type, dtype=amp_dtype or torch.bfloat16, enabled=amp_dtype is not None):
+                y_pred = model(x)
+            y_pred = y_pred.float().view(-1)
+
+            loss = loss_fn(y_pred, y)
+            epoch_loss += loss.item()
+
+        epoch_loss = epoch_loss/len(loader)
+    return epoch_loss
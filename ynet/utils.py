@@ -0,0 +1,28 @@
+"""Helper functions shared by the training and evaluation scripts"""
+
+import os
+import random
+import numpy as np
+
+
+""" Seeding the randomness. """
+def seeding(seed):
+    import torch
+    random.seed(seed)
+    os.environ["PYTHONHASHSEED"] = str(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    torch.cuda.manual_seed(seed)
+    torch.backends.cudnn.deterministic = True
+
+""" Create a directory. """
+def create_dir(path):
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+""" Calculate the time taken """
+def epoch_time(start_time, end_time):
+    elapsed_time = end_time - start_time
+    elapsed_mins = int(elapsed_time / 60)
+    elapsed_secs = int(elapsed_time - (elapsed_mins * 60))
+    return elapsed_mins, elapsed_secs